@@ -1,7 +1,15 @@
+# Imported first, so that the startup timer covers the other imports
+from src.timing import STARTUP
+
 import subprocess
+from functools import partial
 import gradio as gr
+import numpy as np
 import pandas as pd
+import uvicorn
 from apscheduler.schedulers.background import BackgroundScheduler
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from huggingface_hub import snapshot_download
 import os
 
@@ -14,6 +22,7 @@ from src.about import (
     TITLE,
 )
 from src.display.css_html_js import custom_css
+from src.display.table_cache import TableCache, table_state_key
 from src.display.utils import (
     BENCHMARK_COLS,
     COLS,
@@ -27,43 +36,144 @@ from src.display.utils import (
     WeightType,
     Precision
 )
-from src.envs import API, EVAL_REQUESTS_PATH, EVAL_RESULTS_PATH, QUEUE_REPO, REPO_ID, RESULTS_REPO, TOKEN
+from src.envs import (
+    API,
+    EVAL_REQUESTS_PATH,
+    EVAL_RESULTS_PATH,
+    LEADERBOARD_PAGE_SIZE,
+    LEADERBOARD_REFRESH_INTERVAL,
+    LEADERBOARD_SNAPSHOT_PATH,
+    METRICS_PATH,
+    QUEUE_PAGE_SIZE,
+    QUEUE_REPO,
+    REPO_ID,
+    RESULTS_REPO,
+    SHUTDOWN_TIMEOUT,
+    TABLE_CACHE_MAX_ENTRIES,
+    TOKEN,
+)
+from src.leaderboard.filter_index import FilterIndex
+from src.leaderboard.search_index import SearchIndex
+from src.leaderboard.snapshot import SnapshotStore
+from src.leaderboard.snapshot_file import load_snapshot_frames, save_snapshot_frames, source_signature
+from src.leaderboard.sort_index import page_rows
+from src.log import get_logger
+from src.metrics import METRICS, STAGE_SECONDS, TABLE_UPDATE_SECONDS, TABLE_UPDATES
 from src.populate import get_evaluation_queue_df, get_leaderboard_df
-from src.submission.submit import add_new_eval
+from src.profiling import profiled
+from src.submission.submit import QUEUE_UPLOADS, add_new_eval, seed_admission, start_queue_uploads
+
+STARTUP.lap("imports")
+
+log = get_logger("app")
+
+
+def stop_queue_uploads():
+    """Commits the requests still waiting in the upload buffer, those that fail stay journaled for the next start"""
+    QUEUE_UPLOADS.stop(flush=True)
 
 
 def restart_space():
+    stop_queue_uploads()
     API.restart_space(repo_id=REPO_ID)
 
-try:
-    print(EVAL_REQUESTS_PATH)
-    snapshot_download(
-        repo_id=QUEUE_REPO, local_dir=EVAL_REQUESTS_PATH, repo_type="dataset", tqdm_class=None, etag_timeout=30, token=TOKEN
+
+def download_queue():
+    log.info("Downloading the queue to %s", EVAL_REQUESTS_PATH)
+    with STAGE_SECONDS.time(stage="download_queue"):
+        snapshot_download(
+            repo_id=QUEUE_REPO, local_dir=EVAL_REQUESTS_PATH, repo_type="dataset", tqdm_class=None, etag_timeout=30, token=TOKEN
+        )
+
+
+def download_results():
+    log.info("Downloading the results to %s", EVAL_RESULTS_PATH)
+    with STAGE_SECONDS.time(stage="download_results"):
+        snapshot_download(
+            repo_id=RESULTS_REPO, local_dir=EVAL_RESULTS_PATH, repo_type="dataset", tqdm_class=None, etag_timeout=30, token=TOKEN
+        )
+
+
+def build_snapshot(reuse_saved: bool = False):
+    """Builds the leaderboard and queue frames from the local datasets and publishes them as a new snapshot.
+    With reuse_saved, the frames saved by a previous build from the same source files are loaded instead"""
+    with STAGE_SECONDS.time(stage="snapshot_build"):
+        frames, model_ids = build_frames(reuse_saved)
+    return SNAPSHOTS.publish(
+        frames["leaderboard"], frames["finished"], frames["running"], frames["pending"], model_ids
     )
+
+
+def build_frames(reuse_saved: bool) -> tuple[dict, list]:
+    signature = source_signature(EVAL_RESULTS_PATH, EVAL_REQUESTS_PATH)
+    saved = load_snapshot_frames(LEADERBOARD_SNAPSHOT_PATH, signature) if reuse_saved else None
+    if saved is not None:
+        frames, model_ids = saved
+        log.info("Loaded the saved leaderboard snapshot for sources %s", signature[:16])
+    else:
+        raw_data, leaderboard_df = get_leaderboard_df(EVAL_RESULTS_PATH, EVAL_REQUESTS_PATH, COLS, BENCHMARK_COLS)
+        model_ids = [raw_data[i].full_model for i in leaderboard_df.index]
+        # Rows are then identified by their position, in the snapshot and in the tables sent to the UI
+        leaderboard_df = leaderboard_df.reset_index(drop=True)
+        (
+            finished_eval_queue_df,
+            running_eval_queue_df,
+            pending_eval_queue_df,
+        ) = get_evaluation_queue_df(EVAL_REQUESTS_PATH, EVAL_COLS)
+        frames = {
+            "leaderboard": leaderboard_df,
+            "finished": finished_eval_queue_df,
+            "running": running_eval_queue_df,
+            "pending": pending_eval_queue_df,
+        }
+        try:
+            save_snapshot_frames(LEADERBOARD_SNAPSHOT_PATH, signature, frames, model_ids)
+        except OSError as e:
+            log.warning("Could not save the leaderboard snapshot: %s", e)
+    return frames, model_ids
+
+
+def refresh_leaderboard():
+    """Background job: re-syncs the datasets and publishes a rebuilt snapshot, without restarting the Space.
+    If anything fails, the current snapshot keeps being served until the next run."""
+    try:
+        download_queue()
+        download_results()
+        snapshot = build_snapshot()
+    except Exception as e:
+        log.error("Leaderboard refresh failed, still serving version %d: %s", SNAPSHOTS.current.version, e)
+        return
+    log.info("Published leaderboard version %d. Table cache: %s", snapshot.version, TABLE_CACHE.stats())
+
+
+SNAPSHOTS = SnapshotStore()
+TABLE_CACHE = TableCache(TABLE_CACHE_MAX_ENTRIES)
+# Cached tables are only valid for the snapshot they were rendered from
+SNAPSHOTS.subscribe(lambda snapshot: TABLE_CACHE.clear())
+METRICS.register_cache("table", TABLE_CACHE.stats)
+
+try:
+    download_queue()
 except Exception:
     restart_space()
 try:
-    print(EVAL_RESULTS_PATH)
-    snapshot_download(
-        repo_id=RESULTS_REPO, local_dir=EVAL_RESULTS_PATH, repo_type="dataset", tqdm_class=None, etag_timeout=30, token=TOKEN
-    )
+    download_results()
 except Exception:
     restart_space()
+STARTUP.lap("download")
 
+build_snapshot(reuse_saved=True)
+STARTUP.lap("build")
 
-raw_data, original_df = get_leaderboard_df(EVAL_RESULTS_PATH, EVAL_REQUESTS_PATH, COLS, BENCHMARK_COLS)
-leaderboard_df = original_df.copy()
-
-(
-    finished_eval_queue_df,
-    running_eval_queue_df,
-    pending_eval_queue_df,
-) = get_evaluation_queue_df(EVAL_REQUESTS_PATH, EVAL_COLS)
+# Requests accepted before a restart but not committed yet are replayed from the journal, then the submission
+# quotas are seeded with every known request
+start_queue_uploads()
+seed_admission()
 
 
 # Searching and filtering
+@profiled
 def update_table(
-    hidden_df: pd.DataFrame,
     columns_info: list,
     columns_IE: list,
     columns_TA: list,
@@ -79,21 +189,58 @@ def update_table(
     size_query: list,
     show_deleted: bool,
     query: str,
+    sort_column: str = None,
+    sort_descending: bool = True,
+    page: int = 1,
+    snapshot_version: int = None,
 ):
+    """Returns one page of the filtered and sorted leaderboard, and the summary of the rows found"""
     # Combine all column selections
     selected_columns = (
         columns_info + columns_IE + columns_TA + columns_QA + columns_TG +
         columns_RM + columns_FO + columns_DM + columns_spanish + columns_other
     )
+    # Work on the snapshot the page was loaded with, or on the current one if it is no longer kept
+    snapshot = SNAPSHOTS.get(snapshot_version) or SNAPSHOTS.current
+    cache_key = table_state_key(
+        snapshot.version,
+        selected_columns,
+        type_query,
+        precision_query,
+        size_query,
+        show_deleted,
+        query,
+        sort_column,
+        sort_descending,
+        page,
+    )
+    result = TABLE_CACHE.get(cache_key)
+    TABLE_UPDATES.inc(cached="true" if result is not None else "false")
+    if result is not None:
+        return result
     # Filter models based on queries
-    filtered_df = filter_models(hidden_df, type_query, size_query, precision_query, show_deleted)
-    filtered_df = filter_queries(query, filtered_df)
-    df = select_columns(filtered_df, selected_columns)
-    return df
-
-
-def search_table(df: pd.DataFrame, query: str) -> pd.DataFrame:
-    return df[(df[AutoEvalColumn.model.name].str.contains(query, case=False))]
+    with TABLE_UPDATE_SECONDS.time(phase="filter"):
+        keep = filter_models(type_query, size_query, precision_query, show_deleted, snapshot.filter_index)
+    with TABLE_UPDATE_SECONDS.time(phase="search"):
+        keep = filter_queries(query, keep, snapshot.search_index)
+    with TABLE_UPDATE_SECONDS.time(phase="sort"):
+        rows = snapshot.sort_index.order(keep, sort_column, sort_descending)
+    with TABLE_UPDATE_SECONDS.time(phase="select"):
+        result = render_page(snapshot, rows, page, selected_columns)
+    # Tables of a snapshot no longer current would outlive the cache clear of its replacement
+    if snapshot is SNAPSHOTS.current:
+        TABLE_CACHE.put(cache_key, result)
+    return result
+
+
+def render_page(snapshot, rows, page: int, columns: list) -> tuple[pd.DataFrame, str]:
+    """Builds the table of one page out of the ordered row positions. Only the rows of the page are copied"""
+    shown_rows, page, pages = page_rows(rows, page, LEADERBOARD_PAGE_SIZE)
+    df = select_columns(snapshot.leaderboard_df.iloc[shown_rows], columns)
+    summary = f"{len(rows)} models"
+    if LEADERBOARD_PAGE_SIZE > 0:
+        summary += f", page {page} of {pages}"
+    return df, summary
 
 
 def select_columns(df: pd.DataFrame, columns: list) -> pd.DataFrame:
@@ -108,75 +255,77 @@ def select_columns(df: pd.DataFrame, columns: list) -> pd.DataFrame:
     # We use COLS to maintain sorting
     filtered_df = df[[c for c in COLS if c in df.columns and c in unique_columns]]
 
-    # Debugging print to see if the new columns are included
-    print(f"Columns included in DataFrame: {filtered_df.columns.tolist()}")
+    # Debugging log to see if the new columns are included
+    log.debug("Columns included in DataFrame: %s", filtered_df.columns.tolist())
 
     return filtered_df
 
 
 
 
-def filter_queries(query: str, filtered_df: pd.DataFrame) -> pd.DataFrame:
-    final_df = []
-    if query != "":
-        queries = [q.strip() for q in query.split(";")]
-        for _q in queries:
-            _q = _q.strip()
-            if _q != "":
-                temp_filtered_df = search_table(filtered_df, _q)
-                if len(temp_filtered_df) > 0:
-                    final_df.append(temp_filtered_df)
-        if len(final_df) > 0:
-            filtered_df = pd.concat(final_df)
-            filtered_df = filtered_df.drop_duplicates(
-                subset=[AutoEvalColumn.model.name, AutoEvalColumn.precision.name, AutoEvalColumn.revision.name]
-            )
-
-    return filtered_df
+def filter_queries(query: str, keep: np.ndarray, search_index: SearchIndex) -> np.ndarray:
+    """Narrows the kept rows to the ones matching any of the `;` separated queries, unless none matches"""
+    if query.strip() == "":
+        return keep
+    matched = np.zeros(len(keep), dtype=bool)
+    matched[search_index.search(query)] = True
+    matched &= keep
+    if matched.any():
+        keep = matched
+    return keep
 
 
 def filter_models(
-    df: pd.DataFrame, type_query: list, size_query: list, precision_query: list, show_deleted: bool
-) -> pd.DataFrame:
-    # Show all models
-    if show_deleted:
-        filtered_df = df
-    else:
-        filtered_df = df[df[AutoEvalColumn.still_on_hub.name] == True]
-
-    if "All" not in type_query:
-        if "?" in type_query:
-            filtered_df = filtered_df.loc[~df[AutoEvalColumn.model_type_symbol.name].isin([t for t in ModelType if t != "?"])]
-        else:
-            type_emoji = [t[0] for t in type_query]
-            filtered_df = filtered_df.loc[df[AutoEvalColumn.model_type_symbol.name].isin(type_emoji)]
-
-    if "All" not in precision_query:
-        if "?" in precision_query:
-            filtered_df = filtered_df.loc[df[AutoEvalColumn.precision.name].isna()]
-        else:
-            filtered_df = filtered_df.loc[df[AutoEvalColumn.precision.name].isin(precision_query + ["None"])]
-
-    if "All" not in size_query:
-        if "?" in size_query:
-            filtered_df = filtered_df.loc[df[AutoEvalColumn.params.name].isna()]
-        else:
-            numeric_interval = pd.IntervalIndex(sorted([NUMERIC_INTERVALS[s] for s in size_query]))
-            params_column = pd.to_numeric(df[AutoEvalColumn.params.name], errors="coerce")
-            mask = params_column.apply(lambda x: any(numeric_interval.contains(x)))
-            filtered_df = filtered_df.loc[mask]
-
-    return filtered_df
+    type_query: list, size_query: list, precision_query: list, show_deleted: bool, filter_index: FilterIndex
+) -> np.ndarray:
+    """Boolean mask of the snapshot rows kept by the filters"""
+    return filter_index.mask(type_query, size_query, precision_query, show_deleted)
 
 
 
 def uncheck_all():
     return [], [], [], [], [], [], [], [], [], []
 
+
+def queue_page(snapshot, view: str, page: int) -> pd.DataFrame:
+    """One page of a queue table of the snapshot, view being one of "finished", "running" and "pending"."""
+    df = getattr(snapshot, f"{view}_eval_queue_df")
+    shown_rows, _, _ = page_rows(np.arange(len(df)), page, QUEUE_PAGE_SIZE)
+    return df.iloc[shown_rows]
+
+
+def update_queue_table(view: str, page: int, snapshot_version: int = None) -> pd.DataFrame:
+    snapshot = SNAPSHOTS.get(snapshot_version) or SNAPSHOTS.current
+    return queue_page(snapshot, view, page)
+
+
+DEFAULT_LEADERBOARD_COLS = [c.name for c in fields(AutoEvalColumn) if c.never_hidden] + [
+    c.name for c in fields(AutoEvalColumn) if c.displayed_by_default and not c.never_hidden
+]
+
+
+def load_current_snapshot():
+    """Serves the current snapshot to a newly loaded page. The page then keeps working on this version."""
+    snapshot = SNAPSHOTS.current
+    table, summary = render_page(snapshot, np.arange(len(snapshot.leaderboard_df)), 1, DEFAULT_LEADERBOARD_COLS)
+    return (
+        table,
+        summary,
+        gr.Accordion(label=f"✅ Finished Evaluations ({len(snapshot.finished_eval_queue_df)})"),
+        queue_page(snapshot, "finished", 1),
+        gr.Accordion(label=f"🔄 Running Evaluation Queue ({len(snapshot.running_eval_queue_df)})"),
+        queue_page(snapshot, "running", 1),
+        gr.Accordion(label=f"⏳ Pending Evaluation Queue ({len(snapshot.pending_eval_queue_df)})"),
+        queue_page(snapshot, "pending", 1),
+        snapshot.version,
+    )
+
+
 # Get a list of all logo files in the directory
 logos_dir = "logos"
 logo_files = sorted([f for f in os.listdir(logos_dir) if f.endswith(('.png', '.jpg', '.jpeg'))])
 
+startup_snapshot = SNAPSHOTS.current
 demo = gr.Blocks(css=custom_css)
 with demo:
     gr.HTML(TITLE)
@@ -310,33 +459,48 @@ with demo:
                         interactive=True,
                         elem_id="filter-columns-size",
                     )
+                    with gr.Row():
+                        sort_column = gr.Dropdown(
+                            label="Sort by (leaderboard rank if empty)",
+                            choices=COLS,
+                            value=None,
+                            interactive=True,
+                            elem_id="sort-column",
+                        )
+                        sort_descending = gr.Checkbox(
+                            value=True,
+                            label="Descending",
+                            info="Best scores first, lower-is-better scores such as TSA's RMSE are sorted ascending",
+                            interactive=True,
+                        )
 
-
+            startup_table, startup_summary = render_page(
+                startup_snapshot, np.arange(len(startup_snapshot.leaderboard_df)), 1, DEFAULT_LEADERBOARD_COLS
+            )
+            with gr.Row():
+                table_summary = gr.Markdown(startup_summary, elem_id="table-summary")
+                page_number = gr.Number(
+                    value=1,
+                    precision=0,
+                    minimum=1,
+                    label="Page",
+                    interactive=True,
+                    visible=LEADERBOARD_PAGE_SIZE > 0,
+                )
             leaderboard_table = gr.Dataframe(
-                value=leaderboard_df[
-                    [c.name for c in fields(AutoEvalColumn) if c.never_hidden]
-                    + [c.name for c in fields(AutoEvalColumn) if c.displayed_by_default and not c.never_hidden]
-                ],
-                headers=[c.name for c in fields(AutoEvalColumn) if c.never_hidden]
-                        + [c.name for c in fields(AutoEvalColumn) if c.displayed_by_default and not c.never_hidden],
+                value=startup_table,
+                headers=DEFAULT_LEADERBOARD_COLS,
                 datatype=TYPES,
                 elem_id="leaderboard-table",
                 interactive=False,
                 visible=True,
             )
 
-
-            # Dummy leaderboard for handling the case when the user uses backspace key
-            hidden_leaderboard_table_for_search = gr.Dataframe(
-                value=original_df[COLS],
-                headers=COLS,
-                datatype=TYPES,
-                visible=False,
-            )
+            # Version of the snapshot shown on the page, the table itself stays on the server
+            snapshot_version = gr.State(value=startup_snapshot.version)
             search_bar.submit(
                 update_table,
                 inputs=[
-                    hidden_leaderboard_table_for_search,
                     shown_columns_info,
                     shown_columns_IE,
                     shown_columns_TA,
@@ -352,8 +516,12 @@ with demo:
                     filter_columns_size,
                     deleted_models_visibility,
                     search_bar,
+                    sort_column,
+                    sort_descending,
+                    page_number,
+                    snapshot_version,
                 ],
-                outputs=leaderboard_table,
+                outputs=[leaderboard_table, table_summary],
             )
             for selector in [
                 shown_columns_info,
@@ -367,12 +535,12 @@ with demo:
                 shown_columns_spanish,
                 shown_columns_other,
                 filter_columns_type, filter_columns_precision, 
-                filter_columns_size, deleted_models_visibility
+                filter_columns_size, deleted_models_visibility,
+                sort_column, sort_descending, page_number,
             ]:
                 selector.change(
                     update_table,
                     inputs=[
-                        hidden_leaderboard_table_for_search,
                         shown_columns_info,
                         shown_columns_IE,
                         shown_columns_TA,
@@ -388,8 +556,12 @@ with demo:
                         filter_columns_size,
                         deleted_models_visibility,
                         search_bar,
+                        sort_column,
+                        sort_descending,
+                        page_number,
+                        snapshot_version,
                     ],
-                    outputs=leaderboard_table,
+                    outputs=[leaderboard_table, table_summary],
                     queue=True,
                 )
 
@@ -403,39 +575,63 @@ with demo:
 
                 with gr.Column():
                     with gr.Accordion(
-                        f"✅ Finished Evaluations ({len(finished_eval_queue_df)})",
+                        f"✅ Finished Evaluations ({len(startup_snapshot.finished_eval_queue_df)})",
                         open=False,
-                    ):
+                    ) as finished_eval_accordion:
                         with gr.Row():
                             finished_eval_table = gr.Dataframe(
-                                value=finished_eval_queue_df,
+                                value=queue_page(startup_snapshot, "finished", 1),
                                 headers=EVAL_COLS,
                                 datatype=EVAL_TYPES,
                                 row_count=5,
                             )
+                        finished_eval_page = gr.Number(
+                            value=1, precision=0, minimum=1, label="Page", visible=QUEUE_PAGE_SIZE > 0
+                        )
+                        finished_eval_page.change(
+                            partial(update_queue_table, "finished"),
+                            inputs=[finished_eval_page, snapshot_version],
+                            outputs=finished_eval_table,
+                        )
                     with gr.Accordion(
-                        f"🔄 Running Evaluation Queue ({len(running_eval_queue_df)})",
+                        f"🔄 Running Evaluation Queue ({len(startup_snapshot.running_eval_queue_df)})",
                         open=False,
-                    ):
+                    ) as running_eval_accordion:
                         with gr.Row():
                             running_eval_table = gr.Dataframe(
-                                value=running_eval_queue_df,
+                                value=queue_page(startup_snapshot, "running", 1),
                                 headers=EVAL_COLS,
                                 datatype=EVAL_TYPES,
                                 row_count=5,
                             )
+                        running_eval_page = gr.Number(
+                            value=1, precision=0, minimum=1, label="Page", visible=QUEUE_PAGE_SIZE > 0
+                        )
+                        running_eval_page.change(
+                            partial(update_queue_table, "running"),
+                            inputs=[running_eval_page, snapshot_version],
+                            outputs=running_eval_table,
+                        )
 
                     with gr.Accordion(
-                        f"⏳ Pending Evaluation Queue ({len(pending_eval_queue_df)})",
+                        f"⏳ Pending Evaluation Queue ({len(startup_snapshot.pending_eval_queue_df)})",
                         open=False,
-                    ):
+                    ) as pending_eval_accordion:
                         with gr.Row():
                             pending_eval_table = gr.Dataframe(
-                                value=pending_eval_queue_df,
+                                value=queue_page(startup_snapshot, "pending", 1),
                                 headers=EVAL_COLS,
                                 datatype=EVAL_TYPES,
                                 row_count=5,
                             )
+                        pending_eval_page = gr.Number(
+                            value=1, precision=0, minimum=1, label="Page", visible=QUEUE_PAGE_SIZE > 0
+                        )
+                        pending_eval_page.change(
+                            partial(update_queue_table, "pending"),
+                            inputs=[pending_eval_page, snapshot_version],
+                            outputs=pending_eval_table,
+                        )
             with gr.Row():
                 gr.Markdown("# ✉️✨ Submit your model here!", elem_classes="markdown-text")
 
@@ -492,6 +688,22 @@ with demo:
                     logo_path = os.path.join(logos_dir, logo)
                     gr.Image(logo_path, show_label=False, elem_id="logo-image", width=100, height=100)
 
+    demo.load(
+        load_current_snapshot,
+        inputs=[],
+        outputs=[
+            leaderboard_table,
+            table_summary,
+            finished_eval_accordion,
+            finished_eval_table,
+            running_eval_accordion,
+            running_eval_table,
+            pending_eval_accordion,
+            pending_eval_table,
+            snapshot_version,
+        ],
+    )
+
     with gr.Row():
         with gr.Accordion("📙 Citation", open=False):
             citation_button = gr.Textbox(
@@ -502,7 +714,26 @@ with demo:
                 show_copy_button=True,
             )
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(restart_space, "interval", seconds=1800)
-scheduler.start()
-demo.queue(default_concurrency_limit=40).launch()
+STARTUP.lap("ui")
+log.info(STARTUP.report())
+
+# Importing the app (e.g. from the benchmarks) builds it without serving it
+if __name__ == "__main__":
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(refresh_leaderboard, "interval", seconds=LEADERBOARD_REFRESH_INTERVAL, max_instances=1, coalesce=True)
+    scheduler.start()
+    # The UI is mounted on a FastAPI app which also serves the Prometheus metrics
+    server = FastAPI()
+    server.add_event_handler("shutdown", stop_queue_uploads)
+
+    @server.get(METRICS_PATH)
+    def metrics():
+        return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+    server = gr.mount_gradio_app(server, demo.queue(default_concurrency_limit=40), path="/")
+    uvicorn.run(
+        server,
+        host=os.environ.get("GRADIO_SERVER_NAME", "127.0.0.1"),
+        port=int(os.environ.get("GRADIO_SERVER_PORT", 7860)),
+        timeout_graceful_shutdown=SHUTDOWN_TIMEOUT,
+    )
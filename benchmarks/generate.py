@@ -0,0 +1,150 @@
+"""Writes a synthetic leaderboard: result files, request files and a fake hub, in the layouts the Space reads.
+
+    python -m benchmarks.generate --models 1000 --out /tmp/leaderboard
+
+The tree has the same layout as HF_HOME on the Space:
+    {out}/eval-results/{org}/{model}/results_{date}.json   lm-eval style, with `config` and `results` for every task
+    {out}/eval-queue/{org}/{model}_eval_request_False_{precision}_{weight_type}.json   in every status
+    {out}/hub/{org}/{model}/config.json, README.md, ...   read through HUB_FILES_ROOT instead of the hub
+"""
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from src.about import Tasks
+
+ORGS_PER_MODELS = 20 # one organisation per 20 models
+PRECISIONS = ["float16", "bfloat16", "float32"]
+MODEL_TYPES = ["pretrained", "fine-tuned", "instruction-tuned", "RL-tuned"]
+WEIGHT_TYPES = ["Original", "Original", "Original", "Delta", "Adapter"]
+# Statuses of the requests of models without results, the evaluated models are FINISHED
+QUEUE_STATUSES = ["PENDING", "RUNNING", "RERUN", "FAILED", "PENDING_NEW_EVAL", "FINISHED_WITH_ERRORS"]
+ARCHITECTURES = [("llama", "LlamaForCausalLM"), ("mistral", "MistralForCausalLM"), ("qwen2", "Qwen2ForCausalLM")]
+LICENSES = ["apache-2.0", "mit", "llama3", "other"]
+START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+MODEL_CARD_TEXT = (
+    "A synthetic financial language model, fine-tuned on earnings call transcripts, annual reports and financial "
+    "news. It exists only to exercise the leaderboard: the scores, the request and this card are all generated."
+)
+
+
+def metric_value(task, rng: random.Random) -> float:
+    """A raw score in the range of the task metric"""
+    if task.metric == "MCC":
+        return rng.uniform(-1, 1)
+    if task.metric == "SR":
+        return rng.uniform(-3, 3)
+    return rng.uniform(0, 1)
+
+
+def write_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def request_entry(
+    model: str, precision: str, weight_type: str, model_type: str, status: str, submitted: datetime, rng: random.Random
+) -> dict:
+    return {
+        "model": model,
+        "base_model": f"{model}-base" if weight_type != "Original" else "",
+        "revision": "main",
+        "precision": precision,
+        "weight_type": weight_type,
+        "status": status,
+        "submitted_time": submitted.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "model_type": model_type,
+        "likes": rng.randint(0, 5000),
+        "params": rng.choice([0, 0.5, 1.5, 7, 8, 13, 34, 70, 141]),
+        "license": rng.choice(LICENSES),
+        "private": False,
+    }
+
+
+def write_hub_repo(repo: str, rng: random.Random):
+    """A model repository with what the hub checks of the Space read: config, tokenizer and model card"""
+    config_type, architecture = rng.choice(ARCHITECTURES)
+    write_json(os.path.join(repo, "config.json"), {"model_type": config_type, "architectures": [architecture]})
+    write_json(os.path.join(repo, "tokenizer_config.json"), {"tokenizer_class": "PreTrainedTokenizerFast"})
+    write_json(os.path.join(repo, "tokenizer.json"), {})
+    with open(os.path.join(repo, "README.md"), "w") as f:
+        f.write(f"---\nlicense: {rng.choice(LICENSES)}\n---\n\n# {os.path.basename(repo)}\n\n{MODEL_CARD_TEXT}\n")
+
+
+def generate_tree(out: str, models: int, queued: int = None, unsubmitted: int = 0, seed: int = 0) -> dict:
+    """Writes `models` evaluated models (result files and FINISHED requests) and `queued` requests in the other
+    statuses, models // 2 by default, plus `unsubmitted` models only on the hub, to submit. Returns the counts of
+    files written"""
+    rng = random.Random(seed)
+    queued = models // 2 if queued is None else queued
+    orgs = [f"org-{i:04d}" for i in range(max(1, models // ORGS_PER_MODELS))]
+    counts = {"result_files": 0, "request_files": 0, "hub_repos": 0}
+
+    for i in range(models + queued):
+        org = orgs[i % len(orgs)]
+        name = f"fin-model-{i:06d}"
+        model = f"{org}/{name}"
+        precision = rng.choice(PRECISIONS)
+        weight_type = rng.choice(WEIGHT_TYPES)
+        model_type = rng.choice(MODEL_TYPES)
+        submitted = START_DATE + timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+        evaluated = i < models
+        status = "FINISHED" if evaluated else QUEUE_STATUSES[i % len(QUEUE_STATUSES)]
+
+        write_json(
+            os.path.join(out, "eval-queue", org, f"{name}_eval_request_False_{precision}_{weight_type}.json"),
+            request_entry(model, precision, weight_type, model_type, status, submitted, rng),
+        )
+        counts["request_files"] += 1
+
+        if evaluated:
+            # Some models are missing one benchmark, and are then left out of the leaderboard
+            results = {
+                task.value.benchmark: {task.value.metric: metric_value(task.value, rng)}
+                for task in Tasks
+                if rng.random() > 0.005
+            }
+            evaluated_at = submitted + timedelta(days=1)
+            write_json(
+                os.path.join(out, "eval-results", org, name, f"results_{evaluated_at:%Y-%m-%dT%H-%M-%S.%f}.json"),
+                {
+                    "config": {
+                        "model_dtype": f"torch.{precision}",
+                        "model_type": model_type,
+                        "model_name": model,
+                        "model_sha": "main",
+                    },
+                    "results": results,
+                },
+            )
+            counts["result_files"] += 1
+
+        # A few models were deleted from the hub since they were submitted
+        if rng.random() < 0.05:
+            continue
+        write_hub_repo(os.path.join(out, "hub", org, name), rng)
+        counts["hub_repos"] += 1
+
+    for i in range(unsubmitted):
+        write_hub_repo(os.path.join(out, "hub", orgs[i % len(orgs)], f"new-model-{i:06d}"), rng)
+        counts["hub_repos"] += 1
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes a synthetic leaderboard tree")
+    parser.add_argument("--models", type=int, default=1000, help="evaluated models")
+    parser.add_argument("--queued", type=int, default=None, help="requests not evaluated yet, models // 2 by default")
+    parser.add_argument("--unsubmitted", type=int, default=0, help="models only on the hub, to submit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    print(generate_tree(args.out, args.models, args.queued, args.unsubmitted, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Times the leaderboard build, the queue and the table updates on synthetic leaderboards (see generate.py).
+
+    python -m benchmarks.run                          # 100, 1k and 10k models
+    python -m benchmarks.run --sizes 1000 --save      # also saves the results as the baseline
+    python -m benchmarks.run --sizes 1000 --compare   # exits with 1 if a benchmark is slower than the baseline
+
+Each size runs in fresh processes on its own tree, with the datasets download stubbed out and the hub checks read from
+the generated fake hub (HUB_FILES_ROOT), so nothing goes over the network. Cold benchmarks run once per process,
+warm ones `--repeat` times. Times are measured in one process and peak memory (tracemalloc) in another, since tracing
+slows the code down.
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generate import generate_tree
+
+DEFAULT_SIZES = [100, 1000, 10000]
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+class Bench:
+    """Collects the time (median and min over the runs) or the peak traced memory of each benchmark"""
+
+    def __init__(self, trace: bool, repeat: int):
+        self.trace = trace
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name: str, fn, setup=None, repeat: int = None):
+        runs = []
+        for _ in range(1 if self.trace else repeat or self.repeat):
+            if setup is not None:
+                setup()
+            if self.trace:
+                tracemalloc.start()
+            started = time.perf_counter()
+            # The code under test prints a lot
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn()
+            runs.append(time.perf_counter() - started)
+            if self.trace:
+                self.results[name] = {"peak_mb": tracemalloc.get_traced_memory()[1] / 2**20}
+                tracemalloc.stop()
+        if not self.trace:
+            self.results[name] = {"median_s": statistics.median(runs), "min_s": min(runs)}
+
+
+def worker(root: str, trace: bool, repeat: int) -> dict:
+    """Runs every benchmark on the tree at root. Must run in a fresh process: the settings are read at import"""
+    os.environ["HF_HOME"] = root
+    os.environ["HUB_FILES_ROOT"] = os.path.join(root, "hub")
+    os.environ["LEADERBOARD_HUB_CHECK"] = "metadata"
+    import huggingface_hub
+
+    huggingface_hub.snapshot_download = lambda **kwargs: None
+
+    bench = Bench(trace, repeat)
+    with contextlib.redirect_stdout(io.StringIO()):
+        from src.display.utils import BENCHMARK_COLS, COLS, EVAL_COLS, AutoEvalColumn, fields
+        from src.envs import EVAL_REQUESTS_PATH, EVAL_RESULTS_PATH, LEADERBOARD_CACHE_PATH
+        from src.leaderboard import queue_catalog
+        from src.leaderboard.queue_catalog import QueueCatalog, get_queue_catalog
+        from src.leaderboard.read_evals import get_raw_eval_results
+        from src.populate import get_evaluation_queue_df, get_leaderboard_df
+
+    # Leaderboard build: the first load parses every file and checks every model on the (fake) hub
+    bench.run("get_raw_eval_results cold", lambda: get_raw_eval_results(EVAL_RESULTS_PATH, EVAL_REQUESTS_PATH), repeat=1)
+    bench.run("get_raw_eval_results warm", lambda: get_raw_eval_results(EVAL_RESULTS_PATH, EVAL_REQUESTS_PATH))
+    bench.run(
+        "get_leaderboard_df warm", lambda: get_leaderboard_df(EVAL_RESULTS_PATH, EVAL_REQUESTS_PATH, COLS, BENCHMARK_COLS)
+    )
+
+    def forget_queue_catalogs():
+        # The leaderboard build above loaded the catalog of the queue, and saved its manifest
+        queue_catalog._CATALOGS.clear()
+        for name in os.listdir(LEADERBOARD_CACHE_PATH):
+            if name.startswith("queue_manifest_"):
+                os.remove(os.path.join(LEADERBOARD_CACHE_PATH, name))
+
+    # Queue: already_submitted_models was replaced by the queue catalog, benchmarked as a fresh catalog and its lookups
+    bench.run(
+        "get_evaluation_queue_df cold",
+        lambda: get_evaluation_queue_df(EVAL_REQUESTS_PATH, EVAL_COLS),
+        setup=forget_queue_catalogs,
+        repeat=1,
+    )
+    bench.run("get_evaluation_queue_df warm", lambda: get_evaluation_queue_df(EVAL_REQUESTS_PATH, EVAL_COLS))
+    cache_path = tempfile.mkdtemp()
+    bench.run("queue catalog load", lambda: QueueCatalog(EVAL_REQUESTS_PATH, cache_path).refresh(), repeat=1)
+    catalog = get_queue_catalog(EVAL_REQUESTS_PATH)
+    submissions = [
+        (request["model"], request["revision"], request["precision"])
+        for view in ["finished", "running", "pending"]
+        for request in catalog.view(view)
+    ]
+    bench.run("queue catalog is_submitted x1000", lambda: [catalog.is_submitted(*s) for s in submissions[:1000]])
+
+    # The app: importing it builds the snapshot and the UI, then update_table serves the page interactions
+    bench.run("app import", lambda: importlib.import_module("app"), repeat=1)
+    app = sys.modules["app"]
+
+    default_columns = [[c.name for c in fields(AutoEvalColumn) if c.displayed_by_default]] + [[] for _ in range(9)]
+    states = {
+        "default": (["All"], ["All"], ["All"], True, ""),
+        "filtered": (["pretrained"], ["float16", "bfloat16"], ["~7", "~13"], False, ""),
+        "search": (["All"], ["All"], ["All"], True, "fin-model-00; org-0001"),
+    }
+    for state, (type_query, precision_query, size_query, show_deleted, query) in states.items():
+        args = default_columns + [type_query, precision_query, size_query, show_deleted, query]
+        bench.run(f"update_table {state}", lambda: app.update_table(*args), setup=app.TABLE_CACHE.clear)
+    args = default_columns + list(states["default"]) + [app.COLS[3], False]
+    bench.run("update_table sorted", lambda: app.update_table(*args), setup=app.TABLE_CACHE.clear)
+    bench.run("update_table cached", lambda: app.update_table(*args))
+    return bench.results
+
+
+def run_size(models: int, repeat: int, keep_tree: bool) -> dict:
+    root = tempfile.mkdtemp(prefix=f"leaderboard-{models}-")
+    counts = generate_tree(root, models)
+    print(f"{models} models: {counts}", flush=True)
+    results = {}
+    for trace in [False, True]:
+        # Each pass starts from an empty cache, so that the cold benchmarks are cold
+        for cache in ["leaderboard-cache", "eval-queue-journal"]:
+            shutil.rmtree(os.path.join(root, cache), ignore_errors=True)
+        command = [sys.executable, "-m", "benchmarks.run", "--worker", root, "--repeat", str(repeat)]
+        output = subprocess.run(command + (["--trace"] if trace else []), check=True, capture_output=True, text=True).stdout
+        for name, measures in json.loads(output.splitlines()[-1]).items():
+            results.setdefault(name, {}).update(measures)
+    if not keep_tree:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Benchmarks slower than the baseline by more than tolerance (a fraction of the baseline time)"""
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, measures in benchmarks.items():
+            expected = baseline.get(size, {}).get(name, {}).get("median_s")
+            if expected is not None and measures["median_s"] > expected * (1 + tolerance):
+                regressions.append(f"{size} models, {name}: {measures['median_s']:.4f}s, baseline {expected:.4f}s")
+    return regressions
+
+
+def report(results: dict, baseline: dict) -> str:
+    lines = [f"{'models':>7} {'benchmark':<36} {'median':>10} {'min':>10} {'peak MB':>9} {'baseline':>10}"]
+    for size, benchmarks in results.items():
+        for name, measures in benchmarks.items():
+            expected = baseline.get(size, {}).get(name, {}).get("median_s")
+            expected = f"{expected:>9.4f}s" if expected is not None else f"{'-':>10}"
+            lines.append(
+                f"{size:>7} {name:<36} {measures['median_s']:>9.4f}s {measures['min_s']:>9.4f}s "
+                f"{measures.get('peak_mb', float('nan')):>9.1f} {expected}"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leaderboard benchmarks on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of evaluated models")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each warm benchmark")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="save the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="fail if a benchmark regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="slowdown allowed by --compare, as a fraction")
+    parser.add_argument("--keep-tree", action="store_true", help="keep the generated trees")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.trace, args.repeat)))
+        return
+
+    results = {str(size): run_size(size, args.repeat, args.keep_tree) for size in args.sizes}
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(report(results, baseline))
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2)
+        print(f"Saved the baseline to {args.baseline}")
+    if args.compare:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
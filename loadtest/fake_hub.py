@@ -0,0 +1,92 @@
+"""Local stand-in for the Hugging Face Hub, for the load tests. Served from a fixture tree (see benchmarks/generate.py):
+    {fixtures}/eval-queue, {fixtures}/eval-results   the queue and results datasets
+    {fixtures}/hub/{org}/{model}                      model repositories: config, tokenizer files, README.md card
+
+`install` patches huggingface_hub so that the app never goes over the network: snapshot_download copies the dataset
+folders, HfApi.model_info, ModelCard.load, HfApi.upload_file/create_commit and HfApi.restart_space use the fixtures.
+The config and tokenizer checks read the model repositories through HUB_FILES_ROOT (see src/submission/hub_files.py),
+which `install` points at the fixtures with the "metadata" hub checks instead of the AutoConfig/AutoTokenizer ones.
+`install` must run before the app settings (src/envs.py) are imported.
+"""
+import os
+import shutil
+import threading
+from types import SimpleNamespace
+
+import huggingface_hub
+from huggingface_hub import HfApi, ModelCard
+from huggingface_hub.utils import EntryNotFoundError, RepositoryNotFoundError
+
+_load_model_card = ModelCard.load
+
+
+class FakeHub:
+    def __init__(self, fixtures: str):
+        self.fixtures = fixtures
+        self.datasets = {} # dataset repo id -> folder
+        self.hub_root = os.path.join(fixtures, "hub")
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def add_dataset(self, repo_id: str, folder: str):
+        self.datasets[repo_id] = os.path.join(self.fixtures, folder)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _repo_dir(self, repo_id: str) -> str:
+        repo_dir = os.path.join(self.hub_root, repo_id)
+        if not os.path.isdir(repo_dir):
+            raise RepositoryNotFoundError(f"{repo_id} not found in the fake hub")
+        return repo_dir
+
+    def snapshot_download(self, repo_id: str, local_dir: str, **kwargs) -> str:
+        self._count("snapshot_download")
+        shutil.copytree(self.datasets[repo_id], local_dir, dirs_exist_ok=True)
+        return local_dir
+
+    def model_info(self, api, repo_id: str, revision: str = None, **kwargs):
+        self._count("model_info")
+        repo_dir = self._repo_dir(repo_id)
+        card = _load_model_card(os.path.join(repo_dir, "README.md"))
+        return SimpleNamespace(
+            id=repo_id, modelId=repo_id, sha=revision, likes=0, safetensors=None, cardData=card.data.to_dict()
+        )
+
+    def load_model_card(self, repo_id_or_path, **kwargs):
+        self._count("model_card")
+        card_path = os.path.join(self._repo_dir(str(repo_id_or_path)), "README.md")
+        if not os.path.exists(card_path):
+            raise EntryNotFoundError(f"{repo_id_or_path} has no model card")
+        return _load_model_card(card_path)
+
+    def create_commit(self, api, repo_id: str, operations: list, commit_message: str, **kwargs):
+        """Commits to a dataset land in its fixture folder, and come back with the next snapshot_download"""
+        self._count("create_commit")
+        # Imported here, the app modules read the settings when imported
+        from src.submission.upload_queue import LocalRepoApi
+
+        LocalRepoApi(self.datasets[repo_id]).create_commit(repo_id, operations, commit_message)
+
+    def upload_file(self, api, path_or_fileobj, path_in_repo: str, repo_id: str, **kwargs):
+        self._count("upload_file")
+        path = os.path.join(self.datasets[repo_id], path_in_repo.lstrip("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(path_or_fileobj, path)
+
+    def restart_space(self, api, repo_id: str, **kwargs):
+        self._count("restart_space")
+        print(f"Fake hub: restart of {repo_id} requested")
+
+    def install(self):
+        os.environ["HUB_FILES_ROOT"] = self.hub_root
+        os.environ["LEADERBOARD_HUB_CHECK"] = "metadata"
+        os.environ["SUBMISSION_HUB_CHECK"] = "metadata"
+        hub = self
+        huggingface_hub.snapshot_download = self.snapshot_download
+        ModelCard.load = classmethod(lambda cls, repo_id_or_path, **kwargs: hub.load_model_card(repo_id_or_path, **kwargs))
+        HfApi.model_info = lambda api, repo_id, **kwargs: hub.model_info(api, repo_id, **kwargs)
+        HfApi.create_commit = lambda api, **kwargs: hub.create_commit(api, **kwargs)
+        HfApi.upload_file = lambda api, **kwargs: hub.upload_file(api, **kwargs)
+        HfApi.restart_space = lambda api, repo_id, **kwargs: hub.restart_space(api, repo_id, **kwargs)
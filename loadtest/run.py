@@ -0,0 +1,225 @@
+"""Load test of the Space: concurrent users filtering, searching and sorting the leaderboard, and submitting models,
+against app.py served on a local fake hub (see serve.py and fake_hub.py).
+
+    python -m loadtest.run --models 1000 --users 60 --duration 60 --submit-ratio 0.05
+
+Each virtual user has its own Gradio client and sends one event at a time through the client API. The report gives
+the p50/p95/p99 latency and queue wait (time before the event handler started, from the status messages of the
+queue) of each kind of event, and the throughput. The app queue runs with default_concurrency_limit=40, see app.py.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from gradio_client import Client
+from gradio_client.utils import JobStatus, Status
+
+from benchmarks.generate import generate_tree
+from src.display.utils import COLS, NUMERIC_INTERVALS, AutoEvalColumn, ModelType, Precision, fields
+
+COLUMN_GROUPS = {
+    "columns_info": "Model Information",
+    "columns_IE": "Information Extraction (IE)",
+    "columns_TA": "Textual Analysis (TA)",
+    "columns_QA": "Question Answering (QA)",
+    "columns_TG": "Text Generation (TG)",
+    "columns_RM": "Risk Management (RM)",
+    "columns_FO": "Forecasting (FO)",
+    "columns_DM": "Decision-Making (DM)",
+    "columns_spanish": "Spanish",
+    "columns_other": "Other",
+}
+DEFAULT_COLUMNS = {
+    name: [c.name for c in fields(AutoEvalColumn) if c.displayed_by_default and c.category == category]
+    for name, category in COLUMN_GROUPS.items()
+}
+TYPE_CHOICES = [t.to_str() for t in ModelType]
+PRECISION_CHOICES = [p.value.name for p in Precision]
+SIZE_CHOICES = list(NUMERIC_INTERVALS.keys())
+
+
+class TimedJobStatus(JobStatus):
+    """Job status which remembers when the queue started processing the event"""
+
+    process_started = None
+
+    def __setattr__(self, name, value):
+        if name == "latest_status" and value.code == Status.PROCESSING and self.process_started is None:
+            object.__setattr__(self, "process_started", value.time)
+        super().__setattr__(name, value)
+
+
+class TimedClient(Client):
+    def new_helper(self, fn_index: int):
+        helper = super().new_helper(fn_index)
+        helper.job = TimedJobStatus()
+        return helper
+
+
+def table_event(rng: random.Random, model_ids: list[str]) -> tuple[str, dict]:
+    """A random filter, search or sort interaction with the leaderboard table"""
+    kwargs = dict(
+        DEFAULT_COLUMNS,
+        type_query=["All"],
+        precision_query=["All"],
+        size_query=["All"],
+        show_deleted=True,
+        query="",
+        sort_column=None,
+        sort_descending=True,
+        page=1,
+    )
+    kind = rng.choice(["filter", "search", "sort"])
+    if kind == "filter":
+        kwargs["type_query"] = rng.sample(TYPE_CHOICES, rng.randint(1, 3))
+        kwargs["precision_query"] = rng.sample(PRECISION_CHOICES, rng.randint(1, 2))
+        kwargs["size_query"] = rng.sample(SIZE_CHOICES, rng.randint(1, 3))
+        kwargs["show_deleted"] = rng.random() < 0.5
+    elif kind == "search":
+        # Prefixes of model names, sometimes several queries at once
+        kwargs["query"] = "; ".join(rng.choice(model_ids)[: rng.randint(5, 20)] for _ in range(rng.randint(1, 2)))
+    else:
+        kwargs["sort_column"] = rng.choice(COLS)
+        kwargs["sort_descending"] = rng.random() < 0.5
+    return kind, kwargs
+
+
+def submit_event(rng: random.Random, candidates: list[str]) -> dict:
+    """A submission of a model of the fake hub, sometimes one already submitted"""
+    return dict(
+        model=rng.choice(candidates),
+        base_model="",
+        revision="main",
+        precision=rng.choice([p for p in PRECISION_CHOICES if p != Precision.Unknown.value.name]),
+        weight_type="Original",
+        model_type=rng.choice([t.to_str(" : ") for t in ModelType if t != ModelType.Unknown]),
+    )
+
+
+class LoadTest:
+    def __init__(self, url: str, model_ids: list[str], candidates: list[str], submit_ratio: float, seed: int):
+        self.url = url
+        self.model_ids = model_ids
+        self.candidates = candidates
+        self.submit_ratio = submit_ratio
+        self.seed = seed
+        self.samples = [] # (kind, latency, queue wait, ok)
+        self._lock = threading.Lock()
+
+    def user(self, index: int, deadline: float):
+        rng = random.Random(self.seed + index)
+        client = TimedClient(self.url, verbose=False)
+        while time.monotonic() < deadline:
+            if rng.random() < self.submit_ratio:
+                kind, api_name, kwargs = "submit", "/add_new_eval", submit_event(rng, self.candidates)
+            else:
+                kind, kwargs = table_event(rng, self.model_ids)
+                api_name = "/update_table"
+            submitted = datetime.now()
+            started = time.perf_counter()
+            job = client.submit(api_name=api_name, **kwargs)
+            try:
+                job.result()
+                ok = True
+            except Exception as e:
+                print(f"{kind} failed: {e}")
+                ok = False
+            latency = time.perf_counter() - started
+            process_started = job.communicator.job.process_started
+            queue_wait = (process_started - submitted).total_seconds() if process_started else float("nan")
+            with self._lock:
+                self.samples.append((kind, latency, queue_wait, ok))
+
+    def run(self, users: int, duration: float) -> float:
+        deadline = time.monotonic() + duration
+        started = time.perf_counter()
+        threads = [threading.Thread(target=self.user, args=(i, deadline)) for i in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    def report(self, elapsed: float) -> str:
+        lines = [
+            f"{len(self.samples)} events in {elapsed:.1f}s, {len(self.samples) / elapsed:.1f} events/s",
+            f"{'event':<8} {'count':>6} {'errors':>6} {'events/s':>9} "
+            f"{'p50':>8} {'p95':>8} {'p99':>8} {'wait p50':>9} {'wait p95':>9} {'wait p99':>9}",
+        ]
+        kinds = sorted({sample[0] for sample in self.samples}) + ["all"]
+        for kind in kinds:
+            samples = [sample for sample in self.samples if kind in ("all", sample[0])]
+            latencies = np.array([sample[1] for sample in samples])
+            waits = np.array([sample[2] for sample in samples])
+            errors = sum(not sample[3] for sample in samples)
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            w50, w95, w99 = np.nanpercentile(waits, [50, 95, 99]) if not np.isnan(waits).all() else [float("nan")] * 3
+            lines.append(
+                f"{kind:<8} {len(samples):>6} {errors:>6} {len(samples) / elapsed:>9.1f} "
+                f"{p50:>7.3f}s {p95:>7.3f}s {p99:>7.3f}s {w50:>8.3f}s {w95:>8.3f}s {w99:>8.3f}s"
+            )
+        return "\n".join(lines)
+
+
+def wait_until_up(url: str, server: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The app exited with code {server.returncode}")
+        try:
+            Client(url, verbose=False)
+            return
+        except Exception:
+            time.sleep(1)
+    raise TimeoutError(f"The app did not start within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the Space on a local fake hub")
+    parser.add_argument("--models", type=int, default=1000, help="evaluated models of the fixtures")
+    parser.add_argument("--users", type=int, default=60, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--submit-ratio", type=float, default=0.05, help="share of the events that are submissions")
+    parser.add_argument("--quota", type=int, default=0, help="SUBMISSION_QUOTA of the app, 0 for no limit")
+    parser.add_argument("--port", type=int, default=7861)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="fixtures and app state, a new temporary folder by default")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="loadtest-")
+    fixtures = os.path.join(workdir, "fixtures")
+    if not os.path.isdir(fixtures):
+        print(generate_tree(fixtures, args.models, unsubmitted=max(100, args.models // 10), seed=args.seed))
+    hub_root = os.path.join(fixtures, "hub")
+    model_ids = [f"{org}/{model}" for org in sorted(os.listdir(hub_root)) for model in sorted(os.listdir(os.path.join(hub_root, org)))]
+    candidates = [model_id for model_id in model_ids if "/new-model-" in model_id]
+
+    env = dict(os.environ, SUBMISSION_QUOTA=str(args.quota))
+    command = [sys.executable, "-m", "loadtest.serve", "--fixtures", fixtures, "--home", os.path.join(workdir, "home")]
+    with open(os.path.join(workdir, "app.log"), "w") as log:
+        server = subprocess.Popen(command + ["--port", str(args.port)], env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            url = f"http://127.0.0.1:{args.port}/"
+            wait_until_up(url, server, timeout=600)
+            print(f"App up at {url}, logs in {log.name}. {args.users} users for {args.duration:.0f}s")
+            load_test = LoadTest(url, model_ids, candidates, args.submit_ratio, args.seed)
+            elapsed = load_test.run(args.users, args.duration)
+            print(load_test.report(elapsed))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
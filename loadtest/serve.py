@@ -0,0 +1,37 @@
+"""Runs app.py against the fake hub (see fake_hub.py), e.g. for the load tests:
+
+    python -m loadtest.serve --fixtures /tmp/loadtest/fixtures --home /tmp/loadtest/home --port 7861
+
+The app state (synced datasets, caches, upload journal) goes to --home, submissions are committed to the fixtures.
+"""
+import argparse
+import os
+import runpy
+
+from loadtest.fake_hub import FakeHub
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the Space against a local fake hub")
+    parser.add_argument("--fixtures", required=True, help="tree written by benchmarks/generate.py")
+    parser.add_argument("--home", required=True, help="HF_HOME of the app")
+    parser.add_argument("--port", type=int, default=7861)
+    args = parser.parse_args()
+
+    os.environ["HF_HOME"] = args.home
+    os.environ["GRADIO_SERVER_PORT"] = str(args.port)
+    os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+    hub = FakeHub(args.fixtures)
+    hub.install()
+    # The settings are read once the environment is set up
+    from src.envs import QUEUE_REPO, RESULTS_REPO
+
+    hub.add_dataset(QUEUE_REPO, "eval-queue")
+    hub.add_dataset(RESULTS_REPO, "eval-results")
+    runpy.run_path(APP_PATH, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,26 @@ from dataclasses import dataclass
 from enum import Enum
 
 
+@dataclass(frozen=True)
+class Normalization:
+    """Affine rescaling (score + shift) / scale of a raw score, used for display and for the category averages"""
+    shift: float = 0.0
+    scale: float = 1.0
+
+
+NO_NORMALIZATION = Normalization()
+MCC_NORMALIZATION = Normalization(100.0, 2.0) # MCC, from [-100, 100] to [0, 100]
+SR_NORMALIZATION = Normalization(300.0, 6.0) # FinTrade Sharpe ratio
+
+
 @dataclass
 class Task:
     benchmark: str
     metric: str
     col_name: str
     category: str
+    normalization: Normalization = NO_NORMALIZATION
+    higher_is_better: bool = True
 
 
 # Select your tasks here
@@ -15,7 +29,7 @@ class Task:
 class Tasks(Enum):
     task0 = Task("FPB", "F1", "FPB", category="Textual Analysis (TA)")
     task2 = Task("FiQA-SA", "F1", "FiQA-SA", category="Textual Analysis (TA)")
-    task3 = Task("TSA", "RMSE", "TSA", category="Textual Analysis (TA)")
+    task3 = Task("TSA", "RMSE", "TSA", category="Textual Analysis (TA)", higher_is_better=False)
     task4 = Task("Headlines", "AvgF1", "Headlines", category="Textual Analysis (TA)")
     task5 = Task("FOMC", "F1", "FOMC", category="Textual Analysis (TA)")
     task7 = Task("FinArg-ACC", "MicroF1", "FinArg-ACC", category="Textual Analysis (TA)")
@@ -38,21 +52,21 @@ class Tasks(Enum):
     task28 = Task("BigData22", "Acc", "BigData22", category="Forecasting (FO)")
     task30 = Task("ACL18", "Acc", "ACL18", category="Forecasting (FO)")
     task32 = Task("CIKM18", "Acc", "CIKM18", category="Forecasting (FO)")
-    task34 = Task("German", "MCC", "German", category="Risk Management (RM)")
-    task36 = Task("Australian", "MCC", "Australian", category="Risk Management (RM)")
-    task38 = Task("LendingClub", "MCC", "LendingClub", category="Risk Management (RM)")
-    task40 = Task("ccf", "MCC", "ccf", category="Risk Management (RM)")
-    task42 = Task("ccfraud", "MCC", "ccfraud", category="Risk Management (RM)")
-    task44 = Task("polish", "MCC", "polish", category="Risk Management (RM)")
-    task46 = Task("taiwan", "MCC", "taiwan", category="Risk Management (RM)")
-    task48 = Task("portoseguro", "MCC", "portoseguro", category="Risk Management (RM)")
-    task50 = Task("travelinsurance", "MCC", "travelinsurance", category="Risk Management (RM)")
+    task34 = Task("German", "MCC", "German", category="Risk Management (RM)", normalization=MCC_NORMALIZATION)
+    task36 = Task("Australian", "MCC", "Australian", category="Risk Management (RM)", normalization=MCC_NORMALIZATION)
+    task38 = Task("LendingClub", "MCC", "LendingClub", category="Risk Management (RM)", normalization=MCC_NORMALIZATION)
+    task40 = Task("ccf", "MCC", "ccf", category="Risk Management (RM)", normalization=MCC_NORMALIZATION)
+    task42 = Task("ccfraud", "MCC", "ccfraud", category="Risk Management (RM)", normalization=MCC_NORMALIZATION)
+    task44 = Task("polish", "MCC", "polish", category="Risk Management (RM)", normalization=MCC_NORMALIZATION)
+    task46 = Task("taiwan", "MCC", "taiwan", category="Risk Management (RM)", normalization=MCC_NORMALIZATION)
+    task48 = Task("portoseguro", "MCC", "portoseguro", category="Risk Management (RM)", normalization=MCC_NORMALIZATION)
+    task50 = Task("travelinsurance", "MCC", "travelinsurance", category="Risk Management (RM)", normalization=MCC_NORMALIZATION)
     task51 = Task("MultiFin-ES", "F1", "MultiFin-ES", category="Spanish")
     task52 = Task("EFP", "F1", "EFP", category="Spanish")
     task53 = Task("EFPA", "F1", "EFPA", category="Spanish")
     task54 = Task("FinanceES", "F1", "FinanceES", category="Spanish")
     task55 = Task("TSA-Spanish", "F1", "TSA-Spanish", category="Spanish")
-    task56 = Task("FinTrade", "SR", "FinTrade", category="Decision-Making (DM)")
+    task56 = Task("FinTrade", "SR", "FinTrade", category="Decision-Making (DM)", normalization=SR_NORMALIZATION)
 
 NUM_FEWSHOT = 0  # Change with your few shot
 # ---------------------------------------------------
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def model_hyperlink(link, model_name):
     return f'<a target="_blank" href="{link}" style="color: var(--link-text-color); text-decoration: underline;text-decoration-style: dotted;">{model_name}</a>'
 
@@ -25,3 +28,16 @@ def has_no_nan_values(df, columns):
 
 def has_nan_values(df, columns):
     return df[columns].isna().any(axis=1)
+
+
+def round_column(values: np.ndarray, decimals: int) -> np.ndarray:
+    """Vectorized equivalent of calling Python's round(x, decimals) on every value.
+    np.round scales by 10**decimals before rounding, which can disagree with Python's correctly rounded result
+    when the scaled value lands on (or right next to) a .5: those rare values are rounded one by one."""
+    rounded = np.round(values, decimals)
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = values * 10**decimals
+        ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ties.any():
+        rounded[ties] = [round(float(x), decimals) for x in values[ties]]
+    return rounded
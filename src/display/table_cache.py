@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+
+
+def table_state_key(
+    snapshot_version: int,
+    selected_columns: list,
+    type_query: list,
+    precision_query: list,
+    size_query: list,
+    show_deleted: bool,
+    query: str,
+    sort_column: str = None,
+    sort_descending: bool = True,
+    page: int = 1,
+) -> tuple:
+    """Normalized UI state: checkbox order, duplicates, case and the order of `;` separated terms do not matter"""
+    terms = sorted({term.strip().lower() for term in query.split(";") if term.strip() != ""})
+    return (
+        snapshot_version,
+        tuple(sorted(set(selected_columns))),
+        tuple(sorted(set(type_query))),
+        tuple(sorted(set(precision_query))),
+        tuple(sorted(set(size_query))),
+        bool(show_deleted),
+        ";".join(terms),
+        sort_column,
+        bool(sort_descending),
+        page,
+    )
+
+
+class TableCache:
+    """Bounded LRU cache of the results rendered by update_table, keyed by table_state_key.
+    Cached frames are shared between sessions and must not be modified.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        """Returns the cached result, or None"""
+        with self._lock:
+            table = self._entries.get(key)
+            if table is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return table
+
+    def put(self, key: tuple, table):
+        with self._lock:
+            self._entries[key] = table
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry, e.g. when a new snapshot is published. Counters are kept"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
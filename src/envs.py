@@ -21,5 +21,85 @@ EVAL_REQUESTS_PATH = os.path.join(CACHE_PATH, "eval-queue")
 EVAL_RESULTS_PATH = os.path.join(CACHE_PATH, "eval-results")
 EVAL_REQUESTS_PATH_BACKEND = os.path.join(CACHE_PATH, "eval-queue-bk")
 EVAL_RESULTS_PATH_BACKEND = os.path.join(CACHE_PATH, "eval-results-bk")
+LEADERBOARD_CACHE_PATH = os.path.join(CACHE_PATH, "leaderboard-cache")
+LEADERBOARD_SNAPSHOT_PATH = os.path.join(LEADERBOARD_CACHE_PATH, "snapshots")
 
 API = HfApi(token=TOKEN)
+
+# Leaderboard build
+# Workers used to parse result files (process pool) and to query the hub (thread pool). Set both to 1 for a serial build
+INGEST_PARSE_WORKERS = int(os.environ.get("INGEST_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+INGEST_HUB_WORKERS = int(os.environ.get("INGEST_HUB_WORKERS", 8))
+
+# Hub metadata (still_on_hub, architectures) cached between builds, per (model, model_sha)
+HUB_METADATA_CACHE_TTL = float(os.environ.get("HUB_METADATA_CACHE_TTL", 7 * 24 * 3600)) # seconds
+HUB_METADATA_CACHE_NEGATIVE_TTL = float(os.environ.get("HUB_METADATA_CACHE_NEGATIVE_TTL", 6 * 3600)) # seconds, for models not found
+HUB_METADATA_CACHE_MAX_ENTRIES = int(os.environ.get("HUB_METADATA_CACHE_MAX_ENTRIES", 20000))
+
+# How models are checked on the hub: "load" instantiates AutoConfig (and AutoTokenizer), "metadata" only reads the
+# repository file listing, config.json and tokenizer_config.json. Set per call site: leaderboard build and submissions
+LEADERBOARD_HUB_CHECK = os.environ.get("LEADERBOARD_HUB_CHECK", "metadata")
+SUBMISSION_HUB_CHECK = os.environ.get("SUBMISSION_HUB_CHECK", "load")
+# Local folder used instead of the hub by the "metadata" checks, laid out as {org}/{model}/{files} (for tests)
+HUB_FILES_ROOT = os.environ.get("HUB_FILES_ROOT")
+
+# Seconds between two background refreshes of the leaderboard (datasets sync + rebuild)
+LEADERBOARD_REFRESH_INTERVAL = int(os.environ.get("LEADERBOARD_REFRESH_INTERVAL", 1800))
+
+# Tables rendered for the leaderboard UI, cached per snapshot version and UI state (filters, columns, search)
+TABLE_CACHE_MAX_ENTRIES = int(os.environ.get("TABLE_CACHE_MAX_ENTRIES", 256))
+
+# Rows per page of the leaderboard table, 0 shows every row on a single page
+LEADERBOARD_PAGE_SIZE = int(os.environ.get("LEADERBOARD_PAGE_SIZE", 0))
+# Rows per page of the evaluation queue tables, 0 shows every request on a single page
+QUEUE_PAGE_SIZE = int(os.environ.get("QUEUE_PAGE_SIZE", 100))
+
+# Threads running the hub checks of submissions (model and base model on hub, model info, model card)
+SUBMISSION_CHECK_WORKERS = int(os.environ.get("SUBMISSION_CHECK_WORKERS", 16))
+# Results of these checks, shared by repeated and concurrent submissions of a model
+SUBMISSION_LOOKUP_CACHE_TTL = float(os.environ.get("SUBMISSION_LOOKUP_CACHE_TTL", 300)) # seconds
+SUBMISSION_LOOKUP_CACHE_NEGATIVE_TTL = float(os.environ.get("SUBMISSION_LOOKUP_CACHE_NEGATIVE_TTL", 60)) # seconds, for failed checks
+SUBMISSION_LOOKUP_CACHE_MAX_ENTRIES = int(os.environ.get("SUBMISSION_LOOKUP_CACHE_MAX_ENTRIES", 1024))
+
+# Request files of accepted submissions are journaled under QUEUE_JOURNAL_PATH, then committed to the queue dataset
+# in batches: every QUEUE_FLUSH_INTERVAL seconds, or as soon as QUEUE_FLUSH_MAX_BATCH files are waiting
+QUEUE_JOURNAL_PATH = os.environ.get("QUEUE_JOURNAL_PATH", os.path.join(CACHE_PATH, "eval-queue-journal"))
+QUEUE_FLUSH_INTERVAL = float(os.environ.get("QUEUE_FLUSH_INTERVAL", 30)) # seconds
+QUEUE_FLUSH_MAX_BATCH = int(os.environ.get("QUEUE_FLUSH_MAX_BATCH", 50))
+# Delay before retrying a failed commit, doubled after each consecutive failure up to the max
+QUEUE_FLUSH_RETRY_DELAY = float(os.environ.get("QUEUE_FLUSH_RETRY_DELAY", 5)) # seconds
+QUEUE_FLUSH_MAX_RETRY_DELAY = float(os.environ.get("QUEUE_FLUSH_MAX_RETRY_DELAY", 600)) # seconds
+# After this many consecutive failed commits, the files are committed one at a time and the ones that still fail are
+# moved to the "failed" folder of the journal
+QUEUE_FLUSH_MAX_ATTEMPTS = int(os.environ.get("QUEUE_FLUSH_MAX_ATTEMPTS", 8))
+
+# Submissions accepted per organisation in any sliding window of SUBMISSION_QUOTA_WINDOW seconds, 0 for no limit.
+# SUBMISSION_QUOTA_OVERRIDES sets the quota of some organisations, e.g. "TheFinAI:0,some-org:10"
+SUBMISSION_QUOTA = int(os.environ.get("SUBMISSION_QUOTA", 0))
+SUBMISSION_QUOTA_WINDOW = float(os.environ.get("SUBMISSION_QUOTA_WINDOW", 7 * 24 * 3600)) # seconds
+SUBMISSION_QUOTA_OVERRIDES = {
+    organisation.strip(): int(quota)
+    for organisation, quota in (
+        override.rsplit(":", 1) for override in os.environ.get("SUBMISSION_QUOTA_OVERRIDES", "").split(",") if override.strip()
+    )
+}
+
+# Logging of the Space: level, and at most LOG_RATE_LIMIT messages per call site every LOG_RATE_WINDOW seconds
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_RATE_LIMIT = int(os.environ.get("LOG_RATE_LIMIT", 10))
+LOG_RATE_WINDOW = float(os.environ.get("LOG_RATE_WINDOW", 60)) # seconds
+# Path of the Prometheus metrics, served next to the UI
+METRICS_PATH = os.environ.get("METRICS_PATH", "/metrics")
+# Seconds the server waits for open connections (e.g. the queue streams of connected pages) when asked to stop
+SHUTDOWN_TIMEOUT = float(os.environ.get("SHUTDOWN_TIMEOUT", 10))
+
+# Opt-in profiling of the event handlers and of the leaderboard build (see src/profiling.py). PROFILE_MODE is
+# "deterministic" (cProfile) or "sampling" (stack samples every PROFILE_SAMPLE_INTERVAL seconds), empty to disable.
+# One call in PROFILE_EVERY of each function is profiled (0 for none), and with PROFILE_SLOW_THRESHOLD every call is
+# profiled, the ones slower than the threshold being kept
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "")
+PROFILE_EVERY = int(os.environ.get("PROFILE_EVERY", 100))
+PROFILE_SLOW_THRESHOLD = float(os.environ.get("PROFILE_SLOW_THRESHOLD", 0)) # seconds, 0 to disable
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.005)) # seconds
+PROFILE_PATH = os.environ.get("PROFILE_PATH", os.path.join(CACHE_PATH, "profiles"))
+PROFILE_MAX_DUMPS = int(os.environ.get("PROFILE_MAX_DUMPS", 20)) # per function, the oldest are deleted
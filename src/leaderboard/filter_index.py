@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from src.display.utils import NUMERIC_INTERVALS, AutoEvalColumn
+
+
+def _lookup(codes: np.ndarray, uniques, allowed_values) -> np.ndarray:
+    """Maps the codes of a factorized column to a boolean mask of the rows whose value is allowed.
+    Code -1 (missing value) always maps to False."""
+    allowed = np.append(np.isin(np.asarray(uniques, dtype=object), list(allowed_values)), False)
+    return allowed[codes]
+
+
+class FilterIndex:
+    """Precomputed codes of the columns used by the leaderboard filters (model type, precision, size and
+    availability), built once per snapshot. Any combination of filters then resolves to a few array lookups
+    and a single vectorized AND, instead of re-scanning the columns on every UI event.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+        self.on_hub = (df[AutoEvalColumn.still_on_hub.name] == True).to_numpy()
+        self.type_codes, self.type_values = pd.factorize(df[AutoEvalColumn.model_type_symbol.name])
+        self.precision_codes, self.precision_values = pd.factorize(df[AutoEvalColumn.precision.name])
+        self.precision_isna = df[AutoEvalColumn.precision.name].isna().to_numpy()
+
+        params = pd.to_numeric(df[AutoEvalColumn.params.name], errors="coerce").to_numpy(dtype=float)
+        self.params_isna = np.isnan(params)
+        # Bit i is set when the model size falls in the i-th interval of NUMERIC_INTERVALS
+        self.size_buckets = list(NUMERIC_INTERVALS.keys())
+        self.size_bits = np.zeros(self.size, dtype=np.uint32)
+        for i, interval in enumerate(NUMERIC_INTERVALS.values()):
+            left_ok = params >= interval.left if interval.closed_left else params > interval.left
+            right_ok = params <= interval.right if interval.closed_right else params < interval.right
+            self.size_bits[left_ok & right_ok] |= np.uint32(1 << i)
+
+    def mask(self, type_query: list, size_query: list, precision_query: list, show_deleted: bool) -> np.ndarray:
+        """Boolean mask of the rows kept by the filters, with the same semantics as the column-by-column filters"""
+        mask = np.ones(self.size, dtype=bool)
+        if not show_deleted:
+            mask &= self.on_hub
+
+        # A bare "?" does not match any ModelType member, so it keeps every row
+        if "All" not in type_query and "?" not in type_query:
+            type_emoji = [t[0] for t in type_query]
+            mask &= _lookup(self.type_codes, self.type_values, type_emoji)
+
+        if "All" not in precision_query:
+            if "?" in precision_query:
+                mask &= self.precision_isna
+            else:
+                mask &= _lookup(self.precision_codes, self.precision_values, precision_query + ["None"])
+
+        if "All" not in size_query:
+            if "?" in size_query:
+                mask &= self.params_isna
+            else:
+                selected_bits = 0
+                for s in size_query:
+                    selected_bits |= 1 << self.size_buckets.index(s)
+                mask &= (self.size_bits & np.uint32(selected_bits)) != 0
+
+        return mask
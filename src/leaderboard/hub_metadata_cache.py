@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from src.log import get_logger
+
+log = get_logger("hub_metadata_cache")
+
+
+@dataclass
+class HubMetadata:
+    still_on_hub: bool
+    architectures: list
+    error: str = None # failure reason returned by is_model_on_hub, None when the model was found
+    fetched_at: float = 0.0
+    last_used: float = 0.0
+
+
+class HubMetadataCache:
+    """Persistent cache of the hub metadata needed to build the leaderboard, keyed by (model, model_sha).
+    Failures are cached too (negative caching), with their own, shorter, TTL.
+    """
+
+    def __init__(self, path: str, ttl: float, negative_ttl: float, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = None # loaded lazily from self.path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model: str, revision: str) -> str:
+        return f"{model}@{revision}"
+
+    def _load(self):
+        self._entries = {}
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self._entries = {k: HubMetadata(**v) for k, v in data.items()}
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError) as e:
+            log.warning("Ignoring unreadable hub metadata cache %s: %s", self.path, e)
+
+    def _is_expired(self, entry: HubMetadata, now: float) -> bool:
+        ttl = self.ttl if entry.still_on_hub else self.negative_ttl
+        return now - entry.fetched_at > ttl
+
+    def get(self, model: str, revision: str) -> HubMetadata:
+        """Returns the cached metadata, or None if it is missing or expired"""
+        now = time.time()
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            entry = self._entries.get(self._key(model, revision))
+            if entry is None or self._is_expired(entry, now):
+                self.misses += 1
+                return None
+            entry.last_used = now
+            self.hits += 1
+            return entry
+
+    def is_fresh(self, model: str, revision: str) -> bool:
+        """Whether get would return an entry, without counting a hit or a miss"""
+        now = time.time()
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            entry = self._entries.get(self._key(model, revision))
+            return entry is not None and not self._is_expired(entry, now)
+
+    def put(self, model: str, revision: str, still_on_hub: bool, architectures: list, error: str = None) -> HubMetadata:
+        now = time.time()
+        entry = HubMetadata(
+            still_on_hub=still_on_hub,
+            architectures=list(architectures or []),
+            error=error,
+            fetched_at=now,
+            last_used=now,
+        )
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            self._entries[self._key(model, revision)] = entry
+        return entry
+
+    def save(self):
+        """Drops expired entries, evicts the least recently used ones above max_entries and writes the cache to disk"""
+        now = time.time()
+        with self._lock:
+            if self._entries is None:
+                return
+            entries = {k: v for k, v in self._entries.items() if not self._is_expired(v, now)}
+            if len(entries) > self.max_entries:
+                kept = sorted(entries.items(), key=lambda kv: kv[1].last_used, reverse=True)[: self.max_entries]
+                self.evictions += len(entries) - len(kept)
+                entries = dict(kept)
+            self._entries = entries
+            data = {k: asdict(v) for k, v in entries.items()}
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries or {}),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
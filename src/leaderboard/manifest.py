@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import partial
+
+from src.log import get_logger
+from src.metrics import FILE_PARSE_SECONDS
+
+log = get_logger("manifest")
+
+
+@dataclass
+class ManifestEntry:
+    size: int
+    mtime_ns: int
+    digest: str # sha256 of the file content
+    payload: dict # parsed content, None if the file could not be parsed
+
+
+@dataclass
+class ManifestDiff:
+    added: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+
+def load_manifest_entry(path: str, parse) -> ManifestEntry:
+    """Reads, hashes and parses one JSON file. Kept at module level so that it can run in a process pool"""
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        content = f.read()
+    try:
+        payload = parse(json.loads(content))
+    except ValueError:
+        log.warning("Could not parse %s", path)
+        payload = None
+    return ManifestEntry(
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        digest=hashlib.sha256(content).hexdigest(),
+        payload=payload,
+    )
+
+
+def load_timed_manifest_entry(path: str, parse) -> tuple[ManifestEntry, float]:
+    """load_manifest_entry and its duration, measured where it runs"""
+    started = time.perf_counter()
+    entry = load_manifest_entry(path, parse)
+    return entry, time.perf_counter() - started
+
+
+class FileManifest:
+    """Tracks a set of JSON files by path, size, mtime and content hash, and caches a parsed payload per file.
+    The manifest is persisted, so that a restart only re-parses the files that were added or changed since.
+
+    `parse` turns the decoded JSON into the payload to cache. It must be a module level function, and
+    `payload_version` must be bumped whenever its output changes so that stale payloads are dropped.
+    """
+
+    def __init__(self, path: str, parse, payload_version: int = 1):
+        self.path = path
+        self.parse = parse
+        self.payload_version = payload_version
+        self.entries = None # path -> ManifestEntry, loaded lazily
+        self._dirty = False
+
+    def load(self):
+        self.entries = {}
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            log.warning("Ignoring unreadable manifest %s: %s", self.path, e)
+            return
+        if data.get("payload_version") != self.payload_version:
+            return
+        self.entries = {path: ManifestEntry(**entry) for path, entry in data["entries"].items()}
+
+    def is_current(self, paths: list[str]) -> bool:
+        """Whether the files on disk are exactly the ones recorded, judged from size and mtime only"""
+        if self.entries is None:
+            self.load()
+        if len(paths) != len(self.entries):
+            return False
+        for path in paths:
+            entry = self.entries.get(path)
+            if entry is None:
+                return False
+            stat = os.stat(path)
+            if entry.size != stat.st_size or entry.mtime_ns != stat.st_mtime_ns:
+                return False
+        return True
+
+    def refresh(self, paths: list[str], workers: int = 1) -> ManifestDiff:
+        """Brings the manifest up to date with `paths` and returns what changed.
+        Files whose size and mtime are unchanged are not read; the others are hashed, and only re-parsed
+        files with a new content hash count as changed."""
+        if self.entries is None:
+            self.load()
+
+        diff = ManifestDiff()
+        candidates = []
+        for path in paths:
+            entry = self.entries.get(path)
+            stat = os.stat(path)
+            if entry is None or entry.size != stat.st_size or entry.mtime_ns != stat.st_mtime_ns:
+                candidates.append(path)
+
+        load = partial(load_timed_manifest_entry, parse=self.parse)
+        # The pool forks this process: only safe while it runs a single thread, e.g. at startup. Once the scheduler,
+        # upload and server threads run, one of them may hold a lock (logging, metrics) that the workers would inherit
+        # held, and the background refreshes parse their few changed files here instead
+        if workers > 1 and len(candidates) > 1 and threading.active_count() == 1:
+            chunksize = max(1, len(candidates) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                loaded = list(pool.map(load, candidates, chunksize=chunksize))
+        else:
+            loaded = [load(path) for path in candidates]
+
+        for path, (entry, seconds) in zip(candidates, loaded):
+            FILE_PARSE_SECONDS.observe(seconds, parser=self.parse.__name__)
+            previous = self.entries.get(path)
+            self.entries[path] = entry
+            if previous is None:
+                diff.added.append(path)
+            elif previous.digest != entry.digest:
+                diff.changed.append(path)
+
+        current_paths = set(paths)
+        diff.removed = [path for path in self.entries if path not in current_paths]
+        for path in diff.removed:
+            del self.entries[path]
+
+        self._dirty = self._dirty or bool(candidates) or bool(diff.removed)
+        return diff
+
+    def payload(self, path: str) -> dict:
+        return self.entries[path].payload
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "payload_version": self.payload_version,
+                    "entries": {path: asdict(entry) for path, entry in self.entries.items()},
+                },
+                f,
+            )
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import threading
+from collections import defaultdict
+
+from src.envs import LEADERBOARD_CACHE_PATH
+from src.leaderboard.manifest import FileManifest
+
+# Statuses shown in each queue table
+QUEUE_VIEWS = {
+    "finished": lambda status: status.startswith("FINISHED") or status == "PENDING_NEW_EVAL",
+    "running": lambda status: status == "RUNNING",
+    "pending": lambda status: status in ["PENDING", "RERUN"],
+}
+
+
+def read_queue_payload(data: dict) -> dict:
+    return data
+
+
+def find_queue_files(requests_path: str) -> list[str]:
+    """Lists the request files: JSON files at the root of the queue and in the organisation folders"""
+    queue_files = []
+    for entry in sorted(os.listdir(requests_path)):
+        path = os.path.join(requests_path, entry)
+        if entry.startswith("."):
+            continue
+        if entry.endswith(".json"):
+            queue_files.append(path)
+        elif ".md" not in entry and os.path.isdir(path):
+            for sub_entry in sorted(os.listdir(path)):
+                if not sub_entry.startswith(".") and sub_entry.endswith(".json"):
+                    queue_files.append(os.path.join(path, sub_entry))
+    return queue_files
+
+
+def submission_key(model: str, revision: str, precision: str) -> str:
+    return f"{model}_{revision}_{precision}"
+
+
+class QueueCatalog:
+    """Thread-safe catalog of the evaluation requests, indexed by status, by (model, revision, precision) and by
+    organisation. `refresh` only re-reads the request files that changed on disk (see FileManifest), and `add`
+    records a request written by this process right away, so lookups never rescan the request tree.
+    Requests are shared: callers must not modify them.
+    """
+
+    def __init__(self, requests_path: str, cache_path: str = LEADERBOARD_CACHE_PATH):
+        self.requests_path = requests_path
+        tag = hashlib.sha256(os.path.abspath(requests_path).encode()).hexdigest()[:12]
+        self.manifest = FileManifest(os.path.join(cache_path, f"queue_manifest_{tag}.json"), read_queue_payload)
+        self._requests = {} # request file -> request
+        self._by_status = defaultdict(dict) # status -> {request file: request}
+        self._by_submission = defaultdict(set) # submission_key -> request files
+        self._by_org = defaultdict(set) # organisation -> request files
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def _add(self, request_file: str, request: dict):
+        self._remove(request_file)
+        self._requests[request_file] = request
+        self._by_status[request.get("status", "")][request_file] = request
+        self._by_submission[
+            submission_key(request.get("model"), request.get("revision"), request.get("precision"))
+        ].add(request_file)
+        model = request.get("model", "")
+        if model.count("/") == 1:
+            self._by_org[model.split("/")[0]].add(request_file)
+
+    def _remove(self, request_file: str):
+        request = self._requests.pop(request_file, None)
+        if request is None:
+            return
+        self._by_status[request.get("status", "")].pop(request_file, None)
+        self._by_submission[
+            submission_key(request.get("model"), request.get("revision"), request.get("precision"))
+        ].discard(request_file)
+        model = request.get("model", "")
+        if model.count("/") == 1:
+            self._by_org[model.split("/")[0]].discard(request_file)
+
+    def refresh(self, workers: int = 1):
+        """Applies the request files added, changed or removed on disk since the previous refresh"""
+        with self._lock:
+            diff = self.manifest.refresh(find_queue_files(self.requests_path), workers)
+            for path in diff.removed + diff.changed:
+                self._remove(os.path.normpath(path))
+            # On the first refresh of the process, every request of the manifest is new to the catalog
+            changed_paths = diff.added + diff.changed if self._loaded else list(self.manifest.entries)
+            for path in changed_paths:
+                payload = self.manifest.payload(path)
+                if payload is not None:
+                    self._add(os.path.normpath(path), payload)
+            self._loaded = True
+            self.manifest.save()
+
+    def add(self, request_file: str, request: dict):
+        """Records a request written by this process, before the queue dataset is synced again"""
+        with self._lock:
+            self._add(os.path.normpath(request_file), request)
+
+    def claim(self, request_file: str, request: dict) -> bool:
+        """Adds the request unless the same model, revision and precision was already submitted.
+        The check and the insertion are atomic, so concurrent submissions of a model cannot both succeed"""
+        with self._lock:
+            if self.is_submitted(request.get("model"), request.get("revision"), request.get("precision")):
+                return False
+            self.add(request_file, request)
+            return True
+
+    def discard(self, request_file: str):
+        """Forgets a request, e.g. a claimed request whose upload failed"""
+        with self._lock:
+            self._remove(os.path.normpath(request_file))
+
+    def requests(self) -> dict[str, dict]:
+        """All the requests, by request file"""
+        with self._lock:
+            return dict(self._requests)
+
+    def view(self, name: str) -> list[dict]:
+        """Requests of one queue table (see QUEUE_VIEWS), ordered by request file"""
+        matches = QUEUE_VIEWS[name]
+        with self._lock:
+            selected = {}
+            for status, requests in self._by_status.items():
+                if matches(status):
+                    selected.update(requests)
+        return [selected[request_file] for request_file in sorted(selected)]
+
+    def is_submitted(self, model: str, revision: str, precision: str) -> bool:
+        with self._lock:
+            return bool(self._by_submission.get(submission_key(model, revision, precision)))
+
+    def submission_times(self, organisation: str) -> list[str]:
+        """Submission times of the requests of an organisation"""
+        with self._lock:
+            request_files = self._by_org.get(organisation, ())
+            return [
+                self._requests[request_file]["submitted_time"]
+                for request_file in request_files
+                if "submitted_time" in self._requests[request_file]
+            ]
+
+    def submission_times_by_org(self) -> dict[str, list[str]]:
+        """Submission times of the requests of every organisation"""
+        with self._lock:
+            return {organisation: self.submission_times(organisation) for organisation in self._by_org}
+
+
+# One catalog per queue folder, kept for the lifetime of the process
+_CATALOGS = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def get_queue_catalog(requests_path: str) -> QueueCatalog:
+    """Returns the catalog of the queue folder, loading it on first use"""
+    with _CATALOGS_LOCK:
+        catalog = _CATALOGS.get(requests_path)
+        if catalog is None:
+            catalog = _CATALOGS[requests_path] = QueueCatalog(requests_path)
+            catalog.refresh()
+    return catalog
@@ -1,117 +1,73 @@
-import glob
-import json
+import hashlib
 import math
 import os
-from dataclasses import dataclass
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import dateutil
 import numpy as np
 
 from src.display.formatting import make_clickable_model
 from src.display.utils import AutoEvalColumn, ModelType, Tasks, Precision, WeightType
+from src.envs import (
+    HUB_FILES_ROOT,
+    HUB_METADATA_CACHE_MAX_ENTRIES,
+    HUB_METADATA_CACHE_NEGATIVE_TTL,
+    HUB_METADATA_CACHE_TTL,
+    INGEST_HUB_WORKERS,
+    INGEST_PARSE_WORKERS,
+    LEADERBOARD_CACHE_PATH,
+    LEADERBOARD_HUB_CHECK,
+)
+from src.leaderboard.hub_metadata_cache import HubMetadataCache
+from src.leaderboard.manifest import FileManifest
+from src.leaderboard.queue_catalog import get_queue_catalog
+from src.leaderboard.score_store import ModelRecord, ScoreStore
+from src.log import get_logger
+from src.metrics import HUB_CHECK_SECONDS, METRICS, STAGE_SECONDS
 from src.submission.check_validity import is_model_on_hub
+from src.submission.hub_files import get_hub_files
 
 task_benchmarks = {task.value.benchmark for task in Tasks}
 
-@dataclass
+HUB_METADATA_CACHE = HubMetadataCache(
+    os.path.join(LEADERBOARD_CACHE_PATH, "hub_metadata.json"),
+    ttl=HUB_METADATA_CACHE_TTL,
+    negative_ttl=HUB_METADATA_CACHE_NEGATIVE_TTL,
+    max_entries=HUB_METADATA_CACHE_MAX_ENTRIES,
+)
+METRICS.register_cache("hub_metadata", HUB_METADATA_CACHE.stats)
+
+log = get_logger("ingest")
+
+
 class EvalResult:
     """Represents one full evaluation. Built from a combination of the result and request file for a given run.
+    Lightweight view over one row of a ScoreStore: the metadata (eval_name, full_model, precision, ...) is read from
+    and written to the row's ModelRecord, and `results` is rebuilt from the score matrix.
+    Views handed out by a loader are valid until its next load, which can reuse rows.
     """
-    eval_name: str # org_model_precision (uid)
-    full_model: str # org/model (path on hub)
-    org: str 
-    model: str
-    revision: str # commit hash, "" if main
-    results: dict
-    precision: Precision = Precision.Unknown
-    model_type: ModelType = ModelType.Unknown # Pretrained, fine tuned, ...
-    weight_type: WeightType = WeightType.Original # Original or Adapter
-    architecture: str = "Unknown" 
-    license: str = "?"
-    likes: int = 0
-    num_params: int = 0
-    date: str = "" # submission date of request file
-    still_on_hub: bool = False
-
-    @classmethod
-    def init_from_json_file(self, json_filepath):
-        """Inits the result from the specific model result file"""
-        with open(json_filepath) as fp:
-            print(json_filepath)
-            data = json.load(fp)
-
-        config = data.get("config")
-        # Precision
-        precision = Precision.from_str(config.get("model_dtype"))
-
-        # ModelType
-        model_type = ModelType.from_str(config.get("model_type"))
-
-        # Get model and org
-        org_and_model = config.get("model_name", config.get("model_args", None))
-        org_and_model = org_and_model.split("/", 1)
-
-        if len(org_and_model) == 1:
-            org = None
-            model = org_and_model[0]
-            result_key = f"{model}_{precision.value.name}"
-        else:
-            org = org_and_model[0]
-            model = org_and_model[1]
-            result_key = f"{org}_{model}_{precision.value.name}"
-        full_model = "/".join(org_and_model)
-
-        still_on_hub, _, model_config = is_model_on_hub(
-            full_model, config.get("model_sha", "main"), trust_remote_code=True, test_tokenizer=False
-        )
-        architecture = "?"
-        if model_config is not None:
-            architectures = getattr(model_config, "architectures", None)
-            if architectures:
-                architecture = ";".join(architectures)
-
-        # Extract results available in this file (some results are split in several files)
-        results = {}
-        for task in Tasks:
-            task = task.value
-
-            # We average all scores of a given metric (not all metrics are present in all files)
-            accs = np.array([v.get(task.metric, None) for k, v in data["results"].items() if task.benchmark == k])
-            if accs.size == 0 or any([acc is None for acc in accs]):
-                continue
-
-            mean_acc = np.mean(accs) * 100.0
-            results[task.benchmark] = mean_acc
-
-        # Print missing benchmarks if any
-        missing_benchmarks = task_benchmarks - results.keys()
-        if missing_benchmarks:
-            print(f"(Missing results) Model {model} is missing {', '.join(missing_benchmarks)} from result files")
-            for benchmark in missing_benchmarks:
-                results[benchmark] = "missing"
-
-
-
-        return self(
-            eval_name=result_key,
-            full_model=full_model,
-            org=org,
-            model=model,
-            results=results,
-            precision=precision,  
-            revision= config.get("model_sha", ""),
-            still_on_hub=still_on_hub,
-            architecture=architecture,
-            model_type=model_type
-        )
 
+    __slots__ = ("store", "row")
 
-    def update_with_request_file(self, requests_path):
-        """Finds the relevant request file for the current model and updates info with it"""
-        request_file = get_request_file_for_model(requests_path, self.full_model, self.precision.value.name)
+    def __init__(self, store: ScoreStore, row: int):
+        object.__setattr__(self, "store", store)
+        object.__setattr__(self, "row", row)
+
+    def __getattr__(self, name):
+        return getattr(self.store.records[self.row], name)
+
+    def __setattr__(self, name, value):
+        setattr(self.store.records[self.row], name, value)
+
+    @property
+    def results(self) -> dict:
+        return self.store.results(self.row)
+
+    def update_with_request_file(self, request_index):
+        """Updates info with the relevant FINISHED request for the current model, looked up in the request index"""
+        request = request_index.get(self.full_model, self.precision.value.name)
         try:
-            with open(request_file, "r") as f:
-                request = json.load(f)
             self.model_type = ModelType.from_str(request.get("model_type", ""))
             self.weight_type = WeightType[request.get("weight_type", "Original")]
             self.license = request.get("license", "?")
@@ -119,68 +75,15 @@ class EvalResult:
             self.num_params = request.get("params", 0)
             self.date = request.get("submitted_time", "")
         except Exception:
-            print(f"Could not find request file for {self.org}/{self.model} with precision {self.precision.value.name}")
+            log.warning(
+                "Could not find request file for %s/%s with precision %s", self.org, self.model, self.precision.value.name
+            )
 
     def to_dict(self):
         """Converts the Eval Result to a dict compatible with our dataframe display"""
 
-        # Initialize category averages
-        category_averages = {
-            "average_IE": [],
-            "average_TA": [],
-            "average_QA": [],
-            "average_TG": [],
-            "average_RM": [],
-            "average_FO": [],
-            "average_DM": [],
-            "average_Spanish": []
-        }
-
-        # Calculate averages for each task
-        for task in Tasks:
-            score = self.results.get(task.value.benchmark)
-            if score is not None:
-                # Append score to the appropriate category
-                if task.value.category == "Information Extraction (IE)":
-                    category_averages["average_IE"].append(score)
-                elif task.value.category == "Textual Analysis (TA)":
-                    category_averages["average_TA"].append(score)
-                elif task.value.category == "Question Answering (QA)":
-                    category_averages["average_QA"].append(score)
-                elif task.value.category == "Text Generation (TG)":
-                    category_averages["average_TG"].append(score)
-                elif task.value.category == "Risk Management (RM)":
-                    if score == "missing":
-                        category_averages["average_RM"].append(score)
-                    else:
-                        category_averages["average_RM"].append((score + 100) / 2)
-                elif task.value.category == "Forecasting (FO)":
-                    category_averages["average_FO"].append(score)
-                elif task.value.category == "Decision-Making (DM)":
-                    if task.value.benchmark == "FinTrade" and score != "missing":
-                        category_averages["average_DM"].append((score + 300)/6)
-                    else:
-                        category_averages["average_DM"].append(score)
-                elif task.value.category == "Spanish":
-                    category_averages["average_Spanish"].append(score)
-
-        # Calculate the mean for each category and add to data_dict
-        data_dict = {}
-        for category, scores in category_averages.items():
-            # Calculate the average if there are valid scores, otherwise set to 0
-            valid_scores = [score for score in scores if score != "missing"]
-            if valid_scores:
-                average = sum(valid_scores) / len(valid_scores)
-            else:
-                average = 0
-            data_dict[category] = average
-
-        # Overall average
-        total_scores = [v for v in self.results.values() if v != "missing"]
-        overall_average = sum(total_scores) / len(total_scores) if total_scores else 0
-
-        # Add other columns
-        data_dict.update({
+        # Category and overall averages are computed for all models at once, see src/leaderboard/task_scores.py
+        data_dict = {
             "eval_name": self.eval_name,  # not a column, just a save name,
             AutoEvalColumn.precision.name: self.precision.value.name,
             AutoEvalColumn.model_type.name: self.model_type.value.name,
@@ -189,16 +92,17 @@ class EvalResult:
             AutoEvalColumn.architecture.name: self.architecture,
             AutoEvalColumn.model.name: make_clickable_model(self.full_model),
             AutoEvalColumn.revision.name: self.revision,
-            AutoEvalColumn.average.name: overall_average,
             AutoEvalColumn.license.name: self.license,
             AutoEvalColumn.likes.name: self.likes,
             AutoEvalColumn.params.name: self.num_params,
             AutoEvalColumn.still_on_hub.name: self.still_on_hub,
-        })
+        }
 
-        # Add task results to the data dictionary
-        for task in Tasks:
-            data_dict[task.value.col_name] = self.results.get(task.value.benchmark)
+        # Add task results to the data dictionary, reading the row of scores once
+        scores = self.store.scores[self.row].tolist()
+        present = self.store.presence(self.row).tolist()
+        for i, task in enumerate(Tasks):
+            data_dict[task.value.col_name] = scores[i] if present[i] else "missing"
 
         return data_dict
 
@@ -206,30 +110,123 @@ class EvalResult:
 
 
 
-def get_request_file_for_model(requests_path, model_name, precision):
-    """Selects the correct request file for a given model. Only keeps runs tagged as FINISHED"""
-    request_files = os.path.join(
-        requests_path,
-        f"{model_name}_eval_request_*.json",
+# Keys of the result file config that are kept in the parsed payload
+RESULT_CONFIG_KEYS = ["model_dtype", "model_type", "model_name", "model_args", "model_sha"]
+
+
+def read_result_payload(data: dict) -> dict:
+    """Keeps what we need from a result file: the model config and every benchmark/metric it contains,
+    not only the ones in Tasks, so that adding a task does not require re-reading the files"""
+    config = data.get("config")
+    return {
+        "config": {k: config[k] for k in RESULT_CONFIG_KEYS if k in config},
+        "results": data["results"],
+    }
+
+
+def parse_model_key(config: dict) -> dict:
+    """Reads the model identity and the eval_name (org_model_precision) from a result file config"""
+    # Precision
+    precision = Precision.from_str(config.get("model_dtype"))
+
+    # Get model and org
+    org_and_model = config.get("model_name", config.get("model_args", None))
+    org_and_model = org_and_model.split("/", 1)
+
+    if len(org_and_model) == 1:
+        org = None
+        model = org_and_model[0]
+        result_key = f"{model}_{precision.value.name}"
+    else:
+        org = org_and_model[0]
+        model = org_and_model[1]
+        result_key = f"{org}_{model}_{precision.value.name}"
+    full_model = "/".join(org_and_model)
+
+    return dict(eval_name=result_key, full_model=full_model, org=org, model=model, precision=precision)
+
+
+def parse_result_payload(payload: dict) -> dict:
+    """Turns the payload of a result file into the EvalResult fields that do not need the hub"""
+    config = payload["config"]
+    model_key = parse_model_key(config)
+    model = model_key["model"]
+
+    # ModelType
+    model_type = ModelType.from_str(config.get("model_type"))
+
+    # Extract results available in this file (some results are split in several files)
+    results = {}
+    for task in Tasks:
+        task = task.value
+
+        # We average all scores of a given metric (not all metrics are present in all files)
+        accs = np.array([v.get(task.metric, None) for k, v in payload["results"].items() if task.benchmark == k])
+        if accs.size == 0 or any([acc is None for acc in accs]):
+            continue
+
+        mean_acc = np.mean(accs) * 100.0
+        results[task.benchmark] = mean_acc
+
+    # Print missing benchmarks if any
+    missing_benchmarks = task_benchmarks - results.keys()
+    if missing_benchmarks:
+        log.info("(Missing results) Model %s is missing %s from result files", model, ", ".join(missing_benchmarks))
+        for benchmark in missing_benchmarks:
+            results[benchmark] = "missing"
+
+    return dict(
+        **model_key,
+        results=results,
+        revision=config.get("model_sha", ""),
+        model_type=model_type,
+        model_sha=config.get("model_sha", "main"), # revision used for the hub lookup
     )
-    request_files = glob.glob(request_files)
-
-    # Select correct request file (precision)
-    request_file = ""
-    request_files = sorted(request_files, reverse=True)
-    for tmp_request_file in request_files:
-        with open(tmp_request_file, "r") as f:
-            req_content = json.load(f)
-            if (
-                req_content["status"] in ["FINISHED"]
-                and req_content["precision"] == precision.split(".")[-1]
-            ):
-                request_file = tmp_request_file
-    return request_file
-
-
-def get_raw_eval_results(results_path: str, requests_path: str) -> list[EvalResult]:
-    """From the path of the results folder root, extract all needed info for results"""
+
+
+def get_model_hub_info(full_model: str, revision: str) -> tuple[bool, str]:
+    """Checks whether the model is still on the hub and reads its architecture(s) from the config.
+    Answers are kept in HUB_METADATA_CACHE, so unchanged models do not need the hub on the next build"""
+    metadata = HUB_METADATA_CACHE.get(full_model, revision)
+    if metadata is None:
+        with HUB_CHECK_SECONDS.time(check="leaderboard_model"):
+            still_on_hub, error, model_config = is_model_on_hub(
+                full_model,
+                revision,
+                trust_remote_code=True,
+                test_tokenizer=False,
+                metadata_only=LEADERBOARD_HUB_CHECK == "metadata",
+                hub_files=get_hub_files(HUB_FILES_ROOT),
+            )
+        architectures = getattr(model_config, "architectures", None) if model_config is not None else None
+        metadata = HUB_METADATA_CACHE.put(full_model, revision, still_on_hub, architectures, error)
+
+    architecture = "?"
+    if metadata.architectures:
+        architecture = ";".join(metadata.architectures)
+    return metadata.still_on_hub, architecture
+
+
+def init_eval_results(payloads: list[dict], hub_workers: int) -> list[tuple[ModelRecord, dict]]:
+    """Builds the record and the results of each result file payload, running the hub lookups in a bounded
+    thread pool. The output keeps the order of payloads"""
+    parsed_files = [parse_result_payload(payload) for payload in payloads]
+
+    # A model split over several result files only needs to be looked up once
+    hub_keys = list(dict.fromkeys((parsed["full_model"], parsed["model_sha"]) for parsed in parsed_files))
+    with ThreadPoolExecutor(max_workers=max(1, hub_workers)) as pool:
+        hub_info = dict(zip(hub_keys, pool.map(lambda key: get_model_hub_info(*key), hub_keys)))
+
+    eval_results = []
+    for parsed in parsed_files:
+        still_on_hub, architecture = hub_info[(parsed["full_model"], parsed.pop("model_sha"))]
+        results = parsed.pop("results")
+        eval_results.append((ModelRecord(**parsed, still_on_hub=still_on_hub, architecture=architecture), results))
+    return eval_results
+
+
+def find_result_files(results_path: str) -> list[str]:
+    """Lists the result files, in the order in which they are merged"""
     model_result_filepaths = []
 
     for root, _, files in os.walk(results_path):
@@ -246,28 +243,171 @@ def get_raw_eval_results(results_path: str, requests_path: str) -> list[EvalResu
         for file in files:
             model_result_filepaths.append(os.path.join(root, file))
 
-    print(f"Found {len(model_result_filepaths)} JSON files to process.")
+    return model_result_filepaths
 
-    eval_results = {}
-    for model_result_filepath in model_result_filepaths:
-        # Creation of result
-        eval_result = EvalResult.init_from_json_file(model_result_filepath)
-        eval_result.update_with_request_file(requests_path)
 
-        # Store results of same eval together
-        eval_name = eval_result.eval_name
-        if eval_name in eval_results.keys():
-            eval_results[eval_name].results.update({k: v for k, v in eval_result.results.items() if v is not None})
-        else:
-            eval_results[eval_name] = eval_result
+class RequestIndex:
+    """In-memory index of the request files, built from the requests of the queue catalog.
+    Entries are keyed by (full_model, precision, status) and only the newest request is kept per key.
+    """
 
-    results = []
-    for v in eval_results.values():
-        try:
-            v.to_dict() # we test if the dict version is complete
-            results.append(v)
-        except KeyError:  # not all eval values present
-            continue
+    def __init__(self):
+        self._requests = {}
+
+    def add(self, full_model: str, request_file: str, request: dict):
+        key = (full_model, request.get("precision"), request.get("status"))
+        current = self._requests.get(key)
+        # Newest submission wins, the file name breaks ties so that the result does not depend on the scan order
+        if current is None or (request.get("submitted_time", ""), request_file) > (
+            current[1].get("submitted_time", ""),
+            current[0],
+        ):
+            self._requests[key] = (request_file, request)
+
+    def get(self, full_model: str, precision: str, status: str = "FINISHED") -> dict:
+        """Returns the newest request matching the model, precision and status, or None"""
+        entry = self._requests.get((full_model, precision.split(".")[-1], status))
+        return entry[1] if entry is not None else None
+
+
+def request_model_name(request_file: str, requests_path: str) -> str:
+    """Request files are stored as {org}/{model}_eval_request_*.json"""
+    full_model = os.path.relpath(request_file, requests_path).rsplit("_eval_request_", 1)[0]
+    return full_model.replace(os.sep, "/")
+
+
+class EvalResultLoader:
+    """Keeps the eval_results map in sync with the result and request files.
+    The result files are tracked in a persisted manifest: only the files added, changed or removed since the
+    previous load (in this process or a previous one) are re-parsed. The request files come from the queue catalog
+    (see src/leaderboard/queue_catalog.py). Only the evaluations whose files changed are re-merged, along with the
+    evaluations whose hub metadata expired from HUB_METADATA_CACHE, so that they are checked again.
+    """
 
-    print(f"Successfully loaded {len(results)} models.")
-    return results
+    def __init__(self, results_path: str, requests_path: str, cache_path: str = LEADERBOARD_CACHE_PATH):
+        self.results_path = results_path
+        self.requests_path = requests_path
+        tag = hashlib.sha256(f"{os.path.abspath(results_path)}|{os.path.abspath(requests_path)}".encode()).hexdigest()[:12]
+        self.results_manifest = FileManifest(os.path.join(cache_path, f"results_manifest_{tag}.json"), read_result_payload)
+        self.store = ScoreStore()
+        self.eval_results = {} # eval_name -> merged EvalResult, a view over self.store
+        self.request_index = RequestIndex()
+        self._eval_names = {} # result file -> eval_name
+        self._hub_keys = {} # result file -> (full_model, model_sha) of its hub lookup
+        self._requests = None # request file -> request, as of the previous load
+        self._lock = threading.Lock()
+
+    def load(self, parse_workers: int = INGEST_PARSE_WORKERS, hub_workers: int = INGEST_HUB_WORKERS) -> list[EvalResult]:
+        with self._lock, STAGE_SECONDS.time(stage="ingest"):
+            return self._load(parse_workers, hub_workers)
+
+    def _load(self, parse_workers: int, hub_workers: int) -> list[EvalResult]:
+        model_result_filepaths = find_result_files(self.results_path)
+        log.info("Found %d JSON files to process.", len(model_result_filepaths))
+
+        results_diff = self.results_manifest.refresh(model_result_filepaths, parse_workers)
+        catalog = get_queue_catalog(self.requests_path)
+        catalog.refresh(parse_workers)
+        requests = {
+            request_file: request
+            for request_file, request in catalog.requests().items()
+            if "_eval_request_" in os.path.basename(request_file)
+        }
+        # The catalog replaces the request of a file when it changes, comparing identities finds the changed files
+        previous_requests = self._requests or {}
+        changed_requests = [
+            request_file
+            for request_file in requests.keys() | previous_requests.keys()
+            if requests.get(request_file) is not previous_requests.get(request_file)
+        ]
+        log.info(
+            "Result files: %d added, %d changed, %d removed. Request files: %d added, changed or removed.",
+            len(results_diff.added),
+            len(results_diff.changed),
+            len(results_diff.removed),
+            len(changed_requests),
+        )
+
+        # Evaluations that gained, lost or changed a file are re-merged. On the first load of the process,
+        # every file is new to self._eval_names even if the manifest did not need to re-parse it
+        affected = set()
+        for path in results_diff.removed + results_diff.changed:
+            if path in self._eval_names:
+                affected.add(self._eval_names.pop(path))
+                del self._hub_keys[path]
+        for path in model_result_filepaths:
+            payload = self.results_manifest.payload(path)
+            if path not in self._eval_names and payload is not None:
+                model_key = parse_model_key(payload["config"])
+                self._eval_names[path] = model_key["eval_name"]
+                self._hub_keys[path] = (model_key["full_model"], payload["config"].get("model_sha", "main"))
+                affected.add(self._eval_names[path])
+
+        # Models deleted, gated or made private since they were checked show up once their hub metadata expires
+        expired = {
+            self._eval_names[path]
+            for path, hub_key in self._hub_keys.items()
+            if self._eval_names[path] in self.eval_results and not HUB_METADATA_CACHE.is_fresh(*hub_key)
+        }
+        if expired:
+            log.info("Hub metadata expired for %d evaluations, checking them again", len(expired))
+            affected.update(expired)
+
+        if changed_requests or self._requests is None:
+            self.request_index = RequestIndex()
+            for request_file, request in requests.items():
+                self.request_index.add(request_model_name(request_file, self.requests_path), request_file, request)
+            changed_models = {request_model_name(request_file, self.requests_path) for request_file in changed_requests}
+            affected.update(name for name, result in self.eval_results.items() if result.full_model in changed_models)
+            self._requests = requests
+
+        for eval_name in affected:
+            eval_result = self.eval_results.pop(eval_name, None)
+            if eval_result is not None:
+                self.store.remove(eval_result.row)
+
+        # Re-merge the affected evaluations, following the order of model_result_filepaths
+        affected_files = [path for path in model_result_filepaths if self._eval_names.get(path) in affected]
+        payloads = [self.results_manifest.payload(path) for path in affected_files]
+        merged = 0
+        for record, results in init_eval_results(payloads, hub_workers):
+            # Store results of same eval together
+            eval_name = record.eval_name
+            if eval_name in self.eval_results.keys():
+                self.store.update_results(self.eval_results[eval_name].row, results)
+            else:
+                # Creation of result
+                eval_result = EvalResult(self.store, self.store.add(record, results))
+                eval_result.update_with_request_file(self.request_index)
+                self.eval_results[eval_name] = eval_result
+                merged += 1
+
+        self.results_manifest.save()
+        HUB_METADATA_CACHE.save()
+        log.info("Re-merged %d evaluations. Hub metadata cache: %s", merged, HUB_METADATA_CACHE.stats())
+
+        # Keep the order in which evaluations first appear in the result files
+        ordered_names = dict.fromkeys(self._eval_names[path] for path in model_result_filepaths if path in self._eval_names)
+        results = [self.eval_results[eval_name] for eval_name in ordered_names]
+
+        log.info("Successfully loaded %d models.", len(results))
+        return results
+
+
+# One loader per (results_path, requests_path), kept for the lifetime of the process
+_LOADERS = {}
+
+
+def get_raw_eval_results(
+    results_path: str,
+    requests_path: str,
+    parse_workers: int = INGEST_PARSE_WORKERS,
+    hub_workers: int = INGEST_HUB_WORKERS,
+) -> list[EvalResult]:
+    """From the path of the results folder root, extract all needed info for results.
+    Result files are parsed in a process pool of parse_workers and the hub is queried from a pool of hub_workers
+    threads. Only the files that changed since the previous call are re-parsed (see EvalResultLoader)"""
+    key = (results_path, requests_path)
+    if key not in _LOADERS:
+        _LOADERS[key] = EvalResultLoader(results_path, requests_path)
+    return _LOADERS[key].load(parse_workers, hub_workers)
@@ -0,0 +1,133 @@
+import numpy as np
+
+from src.display.utils import ModelType, Precision, Tasks, WeightType
+
+TASK_BENCHMARKS = [task.value.benchmark for task in Tasks]
+TASK_ORDINALS = {benchmark: i for i, benchmark in enumerate(TASK_BENCHMARKS)}
+
+
+class ModelRecord:
+    """Metadata of one evaluation, stored next to its row of scores in a ScoreStore"""
+
+    __slots__ = (
+        "eval_name", # org_model_precision (uid)
+        "full_model", # org/model (path on hub)
+        "org",
+        "model",
+        "revision", # commit hash, "" if main
+        "precision",
+        "model_type", # Pretrained, fine tuned, ...
+        "weight_type", # Original or Adapter
+        "architecture",
+        "license",
+        "likes",
+        "num_params",
+        "date", # submission date of request file
+        "still_on_hub",
+    )
+
+    def __init__(
+        self,
+        eval_name: str,
+        full_model: str,
+        org: str,
+        model: str,
+        revision: str,
+        precision: Precision = Precision.Unknown,
+        model_type: ModelType = ModelType.Unknown,
+        weight_type: WeightType = WeightType.Original,
+        architecture: str = "Unknown",
+        license: str = "?",
+        likes: int = 0,
+        num_params: int = 0,
+        date: str = "",
+        still_on_hub: bool = False,
+    ):
+        self.eval_name = eval_name
+        self.full_model = full_model
+        self.org = org
+        self.model = model
+        self.revision = revision
+        self.precision = precision
+        self.model_type = model_type
+        self.weight_type = weight_type
+        self.architecture = architecture
+        self.license = license
+        self.likes = likes
+        self.num_params = num_params
+        self.date = date
+        self.still_on_hub = still_on_hub
+
+
+class ScoreStore:
+    """Columnar storage of the evaluations: a table of ModelRecord and one contiguous score matrix,
+    indexed by row and by Tasks ordinal, with a bitmask of the benchmarks present in each row.
+    Missing benchmarks are NaN in the matrix and unset in the bitmask.
+
+    Scores are kept as float64 so that the displayed (rounded) values stay exactly the same as with Python floats.
+    Rows of removed evaluations are reused by later additions.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.records = [] # row -> ModelRecord, None for a free row
+        self.scores = np.full((capacity, len(TASK_BENCHMARKS)), np.nan)
+        self.present = np.zeros((capacity, (len(TASK_BENCHMARKS) + 7) // 8), dtype=np.uint8)
+        self._free_rows = []
+
+    def __len__(self):
+        return len(self.records) - len(self._free_rows)
+
+    def _grow(self):
+        capacity = 2 * len(self.scores)
+        scores = np.full((capacity, len(TASK_BENCHMARKS)), np.nan)
+        scores[: len(self.scores)] = self.scores
+        present = np.zeros((capacity, self.present.shape[1]), dtype=np.uint8)
+        present[: len(self.present)] = self.present
+        self.scores, self.present = scores, present
+
+    def add(self, record: ModelRecord, results: dict) -> int:
+        """Stores a new evaluation and returns its row"""
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self.records[row] = record
+        else:
+            row = len(self.records)
+            if row == len(self.scores):
+                self._grow()
+            self.records.append(record)
+        self.scores[row] = np.nan
+        self.present[row] = 0
+        self.update_results(row, results)
+        return row
+
+    def remove(self, row: int):
+        self.records[row] = None
+        self.scores[row] = np.nan
+        self.present[row] = 0
+        self._free_rows.append(row)
+
+    def update_results(self, row: int, results: dict):
+        """Writes {benchmark: score or "missing"} into the row, like dict.update would. None values are skipped."""
+        for benchmark, score in results.items():
+            ordinal = TASK_ORDINALS.get(benchmark)
+            if ordinal is None or score is None:
+                continue
+            byte, bit = divmod(ordinal, 8)
+            if score == "missing":
+                self.scores[row, ordinal] = np.nan
+                self.present[row, byte] &= ~np.uint8(1 << bit)
+            else:
+                self.scores[row, ordinal] = score
+                self.present[row, byte] |= np.uint8(1 << bit)
+
+    def presence(self, rows) -> np.ndarray:
+        """Boolean rows x Tasks matrix of the benchmarks present in the given rows"""
+        return np.unpackbits(self.present[rows], axis=-1, bitorder="little")[..., : len(TASK_BENCHMARKS)].astype(bool)
+
+    def results(self, row: int) -> dict:
+        """Scores of one row as {benchmark: score or "missing"}"""
+        present = self.presence(row)
+        return {
+            benchmark: float(self.scores[row, i]) if present[i] else "missing"
+            for i, benchmark in enumerate(TASK_BENCHMARKS)
+        }
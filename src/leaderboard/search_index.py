@@ -0,0 +1,43 @@
+import bisect
+import re
+
+import numpy as np
+
+# Characters that start a new word in a model id, e.g. "meta-llama/Llama-2-7b_chat.v1"
+WORD_SEPARATORS = re.compile(r"[/\-_. ]")
+
+
+class SearchIndex:
+    """Prefix index over the lower-cased org/model ids of the leaderboard rows, built once per snapshot.
+    Every id is indexed from its start and from the start of each of its words, so a term matches a model
+    when it is a prefix of the full id, of the model name, or of any word (or run of words) of the id.
+    Lookups are bisections in a sorted list of keys and never look at the HTML of the Model column.
+    """
+
+    def __init__(self, model_ids: list[str]):
+        self.size = len(model_ids)
+        entries = set()
+        for row, model_id in enumerate(model_ids):
+            key = model_id.lower()
+            entries.add((key, row))
+            for match in WORD_SEPARATORS.finditer(key):
+                if match.end() < len(key):
+                    entries.add((key[match.end() :], row))
+        entries = sorted(entries)
+        self.keys = [key for key, _ in entries]
+        self.rows = np.array([row for _, row in entries], dtype=np.int64)
+
+    def lookup(self, term: str) -> np.ndarray:
+        """Rows matching a single term"""
+        term = term.strip().lower()
+        start = bisect.bisect_left(self.keys, term)
+        # Keys with the prefix `term` are contiguous and sort before `term` followed by the highest code point
+        end = bisect.bisect_left(self.keys, term + "\U0010ffff", lo=start)
+        return self.rows[start:end]
+
+    def search(self, query: str) -> np.ndarray:
+        """Sorted rows matching any of the `;` separated terms of the query"""
+        terms = [term for term in query.split(";") if term.strip() != ""]
+        if not terms:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate([self.lookup(term) for term in terms]))
@@ -0,0 +1,91 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+from src.leaderboard.filter_index import FilterIndex
+from src.leaderboard.search_index import SearchIndex
+from src.leaderboard.sort_index import SortIndex
+from src.leaderboard.task_scores import LOWER_IS_BETTER_COLS
+
+
+@dataclass(frozen=True)
+class LeaderboardSnapshot:
+    """One published version of the leaderboard and of the evaluation queues.
+    Snapshots are shared by all the event handlers: the frames must never be modified in place.
+    """
+    version: int
+    built_at: float
+    leaderboard_df: pd.DataFrame
+    finished_eval_queue_df: pd.DataFrame
+    running_eval_queue_df: pd.DataFrame
+    pending_eval_queue_df: pd.DataFrame
+    filter_index: FilterIndex # over the rows of leaderboard_df
+    search_index: SearchIndex # over the rows of leaderboard_df
+    sort_index: SortIndex # over the rows of leaderboard_df
+
+
+class SnapshotStore:
+    """Holds the snapshot served to the UI.
+    Readers use `current` without any lock. Publishing swaps a single reference, so a reader always gets
+    a complete snapshot, either the previous one or the new one, and never waits for a rebuild.
+    The last `keep` snapshots stay available by version, for pages loaded before a refresh.
+    """
+
+    def __init__(self, keep: int = 4):
+        self.keep = keep
+        self._current = None
+        self._recent = OrderedDict() # version -> snapshot
+        self._versions = itertools.count(1)
+        self._publish_lock = threading.Lock()
+        self._subscribers = []
+
+    @property
+    def current(self) -> LeaderboardSnapshot:
+        return self._current
+
+    def get(self, version: int) -> LeaderboardSnapshot:
+        """Returns the snapshot with this version, or None if it is no longer kept"""
+        return self._recent.get(version)
+
+    def subscribe(self, callback):
+        """Registers callback(snapshot), called after each publish, e.g. to invalidate caches derived from snapshots"""
+        self._subscribers.append(callback)
+
+    def publish(
+        self,
+        leaderboard_df: pd.DataFrame,
+        finished_eval_queue_df: pd.DataFrame,
+        running_eval_queue_df: pd.DataFrame,
+        pending_eval_queue_df: pd.DataFrame,
+        model_ids: list[str],
+    ) -> LeaderboardSnapshot:
+        """Publishes new frames. `model_ids` are the org/model ids of the leaderboard rows, in row order"""
+        # Derived indexes are built before taking the lock, readers keep using the previous snapshot meanwhile
+        filter_index = FilterIndex(leaderboard_df)
+        search_index = SearchIndex(model_ids)
+        sort_index = SortIndex(leaderboard_df, LOWER_IS_BETTER_COLS)
+        with self._publish_lock:
+            snapshot = LeaderboardSnapshot(
+                version=next(self._versions),
+                built_at=time.time(),
+                leaderboard_df=leaderboard_df,
+                finished_eval_queue_df=finished_eval_queue_df,
+                running_eval_queue_df=running_eval_queue_df,
+                pending_eval_queue_df=pending_eval_queue_df,
+                filter_index=filter_index,
+                search_index=search_index,
+                sort_index=sort_index,
+            )
+            recent = OrderedDict(self._recent)
+            recent[snapshot.version] = snapshot
+            while len(recent) > self.keep:
+                recent.popitem(last=False)
+            self._recent = recent
+            self._current = snapshot
+        for callback in self._subscribers:
+            callback(snapshot)
+        return snapshot
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import asdict
+
+import numpy as np
+import pandas as pd
+
+from src.display.utils import COLS, EVAL_COLS, Tasks
+from src.log import get_logger
+
+log = get_logger("snapshot_file")
+
+# Bump when the layout of the files written by save_snapshot_frames changes
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def schema_fingerprint() -> str:
+    """Hash of everything the built frames depend on besides the source files: the displayed columns and the
+    Tasks registry (benchmarks, metrics, categories, normalization). A snapshot written with another schema is ignored
+    """
+    schema = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "cols": COLS,
+        "eval_cols": EVAL_COLS,
+        "tasks": [asdict(task.value) for task in Tasks],
+    }
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+
+def source_signature(*roots: str) -> str:
+    """Hash of the path, size and mtime of every file under the source folders. Only stats the files, hidden
+    files and folders (e.g. the .cache of snapshot_download) are skipped"""
+    digest = hashlib.sha256()
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for filename in sorted(f for f in filenames if not f.startswith(".")):
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                digest.update(f"{os.path.relpath(path, root)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _snapshot_dir(path: str, signature: str) -> str:
+    return os.path.join(path, signature[:16])
+
+
+def save_snapshot_frames(path: str, signature: str, frames: dict[str, pd.DataFrame], model_ids: list[str]):
+    """Writes the frames as one directory of columns: numeric columns in one .npy file per frame and dtype
+    (memory-mapped on load, one contiguous row per column), the other columns as JSON in the header.
+    The directory is renamed into place once complete, and replaces the snapshots of previous sources"""
+    target = _snapshot_dir(path, signature)
+    tmp = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    header = {
+        "schema": schema_fingerprint(),
+        "signature": signature,
+        "model_ids": list(model_ids),
+        "frames": {},
+    }
+    for name, df in frames.items():
+        columns = []
+        blocks = {} # dtype -> numeric columns, stored together as the rows of one 2-D array
+        for column in df.columns:
+            values = df[column].to_numpy()
+            if values.dtype.kind in "biuf":
+                block = blocks.setdefault(values.dtype.str, [])
+                file = f"{name}_{list(blocks).index(values.dtype.str)}.npy"
+                columns.append({"name": column, "block": file, "position": len(block)})
+                block.append(values)
+            else:
+                columns.append({"name": column, "values": values.tolist()})
+        for i, block in enumerate(blocks.values()):
+            np.save(os.path.join(tmp, f"{name}_{i}.npy"), np.stack(block))
+        header["frames"][name] = {"rows": len(df), "columns": columns}
+    with open(os.path.join(tmp, "header.json"), "w") as f:
+        json.dump(header, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.rename(tmp, target)
+    for entry in os.listdir(path):
+        entry_path = os.path.join(path, entry)
+        if entry_path != target and ".tmp-" not in entry and os.path.isdir(entry_path):
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+
+def load_snapshot_frames(path: str, signature: str) -> tuple[dict[str, pd.DataFrame], list[str]]:
+    """Loads the frames saved for this source signature, with the numeric columns memory-mapped.
+    Returns None if there is no snapshot for these sources or if it was written with another schema"""
+    target = _snapshot_dir(path, signature)
+    try:
+        with open(os.path.join(target, "header.json")) as f:
+            header = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        log.warning("Ignoring unreadable leaderboard snapshot %s: %s", target, e)
+        return None
+    if header.get("signature") != signature or header.get("schema") != schema_fingerprint():
+        return None
+
+    frames = {}
+    for name, frame in header["frames"].items():
+        data = {}
+        blocks = {}
+        for column in frame["columns"]:
+            if "block" in column:
+                if column["block"] not in blocks:
+                    blocks[column["block"]] = np.load(os.path.join(target, column["block"]), mmap_mode="r")
+                data[column["name"]] = blocks[column["block"]][column["position"]]
+            else:
+                data[column["name"]] = pd.Series(column["values"], dtype=object)
+        columns = [column["name"] for column in frame["columns"]]
+        frames[name] = pd.DataFrame(data, index=pd.RangeIndex(frame["rows"]), columns=columns, copy=False)
+    return frames, header["model_ids"]
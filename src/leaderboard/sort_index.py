@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class SortIndex:
+    """Sort permutations of every sortable column of the leaderboard, in both directions, built once per snapshot.
+    Sorts are stable and keep missing values last, so ties stay in leaderboard order. "Descending" puts the best
+    scores first: the columns of `lower_is_better` (e.g. TSA's RMSE) are sorted ascending for it.
+    """
+
+    def __init__(self, df: pd.DataFrame, lower_is_better: list = ()):
+        self.size = len(df)
+        self.permutations = {} # (column, descending) -> row positions in sorted order
+        for column in df.columns:
+            values = df[column].reset_index(drop=True)
+            try:
+                for descending in (False, True):
+                    ascending = descending if column in lower_is_better else not descending
+                    order = values.sort_values(ascending=ascending, kind="stable", na_position="last")
+                    self.permutations[(column, descending)] = order.index.to_numpy()
+            except TypeError:
+                # Mixed types that cannot be compared, the column is not sortable
+                self.permutations.pop((column, False), None)
+
+    @property
+    def columns(self) -> list:
+        return [column for column, descending in self.permutations if not descending]
+
+    def order(self, keep: np.ndarray, column: str = None, descending: bool = True) -> np.ndarray:
+        """Positions of the kept rows, sorted by `column`, or in leaderboard order if column is None"""
+        permutation = self.permutations.get((column, descending))
+        if permutation is None:
+            return np.flatnonzero(keep)
+        return permutation[keep[permutation]]
+
+
+def page_rows(rows: np.ndarray, page: int, page_size: int) -> tuple[np.ndarray, int, int]:
+    """Slices one page out of the ordered rows. Returns the rows of the page, the page number (clamped to the
+    existing pages) and the number of pages. A page_size of 0 disables pagination."""
+    if page_size <= 0:
+        return rows, 1, 1
+    pages = max(1, math.ceil(len(rows) / page_size))
+    page = min(max(1, int(page or 1)), pages)
+    return rows[(page - 1) * page_size : page * page_size], page, pages
@@ -0,0 +1,56 @@
+import numpy as np
+
+from src.display.utils import AutoEvalColumn, Tasks, auto_eval_column_dict
+
+# Everything below is derived from the Tasks registry (src/about.py), in Tasks order
+TASKS = [task.value for task in Tasks]
+SHIFTS = np.array([task.normalization.shift for task in TASKS], dtype=float)
+SCALES = np.array([task.normalization.scale for task in TASKS], dtype=float)
+# Columns of the scores for which lower is better, sorted ascending to show the best models first
+LOWER_IS_BETTER_COLS = [task.col_name for task in TASKS if not task.higher_is_better]
+
+# Category average column of each task category (the average_* columns of AutoEvalColumn)
+CATEGORY_AVERAGE_COLS = {
+    column.category: column.name for name, _, column in auto_eval_column_dict if name.startswith("average_")
+}
+CATEGORY_MASKS = {
+    col_name: np.array([task.category == category for task in TASKS], dtype=bool)
+    for category, col_name in CATEGORY_AVERAGE_COLS.items()
+}
+
+
+def score_matrix(eval_results: list) -> np.ndarray:
+    """Models x Tasks matrix of the raw scores, NaN where a benchmark is missing.
+    The rows are gathered from the ScoreStore the EvalResult views point to."""
+    if not eval_results:
+        return np.full((0, len(TASKS)), np.nan)
+    store = eval_results[0].store
+    return store.scores[[eval_result.row for eval_result in eval_results]]
+
+
+def normalize_scores(matrix: np.ndarray) -> np.ndarray:
+    """Applies the normalization of each task to its column"""
+    return (matrix + SHIFTS) / SCALES
+
+
+def nan_mean(matrix: np.ndarray, columns: np.ndarray = None) -> np.ndarray:
+    """Row means over the non-NaN scores of the selected columns, 0 for rows without any score.
+    Columns are summed one after the other, in Tasks order, so that results match a sequential Python sum"""
+    if columns is not None:
+        matrix = matrix[:, columns]
+    valid = ~np.isnan(matrix)
+    total = np.zeros(matrix.shape[0])
+    for j in range(matrix.shape[1]):
+        total = np.where(valid[:, j], total + matrix[:, j], total)
+    counts = valid.sum(axis=1)
+    return np.divide(total, counts, out=np.zeros(matrix.shape[0]), where=counts > 0)
+
+
+def average_columns(matrix: np.ndarray) -> dict:
+    """Computes the overall and the category averages of every model in one pass over the score matrix.
+    Category averages use the normalized scores, the overall average uses the raw scores."""
+    normalized = normalize_scores(matrix)
+    averages = {AutoEvalColumn.average.name: nan_mean(matrix)}
+    for col_name, columns in CATEGORY_MASKS.items():
+        averages[col_name] = nan_mean(normalized, columns)
+    return averages
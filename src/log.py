@@ -0,0 +1,47 @@
+import logging
+import sys
+import threading
+import time
+
+from src.envs import LOG_LEVEL, LOG_RATE_LIMIT, LOG_RATE_WINDOW
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most `limit` records per call site in each `window` seconds. The number of records dropped
+    meanwhile is appended to the next record let through from that call site"""
+
+    def __init__(self, limit: int, window: float):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._sites = {} # (path, line) -> [window start, records let through, records dropped]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.setdefault((record.pathname, record.lineno), [now, 0, 0])
+            if now - site[0] >= self.window:
+                site[0], site[1] = now, 0
+            if site[1] >= self.limit:
+                site[2] += 1
+                return False
+            site[1] += 1
+            dropped, site[2] = site[2], 0
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} similar messages dropped)"
+        return True
+
+
+_handler = logging.StreamHandler(sys.stdout)
+_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT, LOG_RATE_WINDOW))
+_root = logging.getLogger("leaderboard")
+_root.addHandler(_handler)
+_root.setLevel(LOG_LEVEL)
+_root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger of a part of the Space, e.g. get_logger("submission")"""
+    return _root.getChild(name)
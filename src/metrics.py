@@ -0,0 +1,146 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Keys of the cache stats() dicts exported for every registered cache, with their Prometheus type
+CACHE_STATS = {
+    "entries": "gauge",
+    "hits": "counter",
+    "misses": "counter",
+    "evictions": "counter",
+    "coalesced": "counter",
+    "hit_rate": "gauge",
+}
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {} # label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(dict(zip(self.labels, key)))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._values = {} # label values -> (count per bucket, +Inf last, sum of the values)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the block, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                labels = dict(zip(self.labels, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{format_labels({**labels, 'le': bound})} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Counters and latency histograms of the Space, plus the stats of its caches, rendered in the Prometheus text
+    format. Caches are registered with a function returning their stats() dict, read when the metrics are rendered"""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._metrics = []
+        self._caches = {} # cache name -> stats function
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        metric = Counter(f"{self.prefix}_{name}", help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(f"{self.prefix}_{name}", help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_cache(self, name: str, stats):
+        self._caches[name] = stats
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        cache_stats = {name: stats() for name, stats in self._caches.items()}
+        for key, kind in CACHE_STATS.items():
+            name = f"{self.prefix}_cache_{key}" + ("_total" if kind == "counter" else "")
+            samples = [(cache, values[key]) for cache, values in cache_stats.items() if key in values]
+            if samples:
+                lines.extend([f"# HELP {name} Cache {key.replace('_', ' ')}", f"# TYPE {name} {kind}"])
+                lines.extend(f"{name}{format_labels({'cache': cache})} {value}" for cache, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry("leaderboard")
+
+STAGE_SECONDS = METRICS.histogram(
+    "stage_seconds",
+    "Duration of the refresh stages: download_queue, download_results, ingest, queue, snapshot_build",
+    ("stage",),
+)
+FILE_PARSE_SECONDS = METRICS.histogram(
+    "file_parse_seconds", "Time to read, hash and parse one result or request file", ("parser",)
+)
+HUB_CHECK_SECONDS = METRICS.histogram(
+    "hub_check_seconds", "Duration of the hub lookups not served from a cache", ("check",)
+)
+TABLE_UPDATE_SECONDS = METRICS.histogram(
+    "table_update_seconds", "Duration of the update_table phases: filter, search, sort, select", ("phase",)
+)
+TABLE_UPDATES = METRICS.counter("table_updates_total", "Leaderboard table updates", ("cached",))
+SUBMISSION_SECONDS = METRICS.histogram(
+    "submission_seconds", "Duration of the submission steps: validation, journal, upload", ("step",)
+)
+SUBMISSIONS = METRICS.counter("submissions_total", "Submissions by outcome", ("outcome",))
@@ -1,13 +1,16 @@
-import json
-import os
 import pandas as pd
 import numpy as np
 
-from src.display.formatting import has_no_nan_values, make_clickable_model
+from src.display.formatting import has_no_nan_values, make_clickable_model, round_column
 from src.display.utils import AutoEvalColumn, EvalQueueColumn
+from src.leaderboard.queue_catalog import get_queue_catalog
 from src.leaderboard.read_evals import get_raw_eval_results
+from src.leaderboard.task_scores import TASKS, average_columns, normalize_scores, score_matrix
+from src.metrics import STAGE_SECONDS
+from src.profiling import profiled
 
 
+@profiled
 def get_leaderboard_df(results_path: str, requests_path: str, cols: list, benchmark_cols: list) -> pd.DataFrame:
     """Creates a dataframe from all the individual experiment results"""
     raw_data = get_raw_eval_results(results_path, requests_path)
@@ -15,85 +18,46 @@ def get_leaderboard_df(results_path: str, requests_path: str, cols: list, benchm
 
     df = pd.DataFrame.from_records(all_data_json)
 
-    # Add category average columns with default values
-    category_avg_columns = {
-        "Average IE ⬆️": "average_IE",
-        "Average TA ⬆️": "average_TA",
-        "Average QA ⬆️": "average_QA",
-        "Average TG ⬆️": "average_TG",
-        "Average RM ⬆️": "average_RM",
-        "Average FO ⬆️": "average_FO",
-        "Average DM ⬆️": "average_DM",
-        "Average Spanish ⬆️": "average_Spanish"
-    }
-
-    for display_name, internal_name in category_avg_columns.items():
-        df[display_name] = df[internal_name]
+    # Filter out if any of the benchmarks have not been produced
+    df = df[has_no_nan_values(df, benchmark_cols)]
 
-    df = df.sort_values(by=[AutoEvalColumn.average.name], ascending=False)
+    # Scores of the remaining models, as a models x tasks matrix (NaN for "missing" benchmarks)
+    scores = score_matrix(raw_data)[df.index.to_numpy()]
+    for col_name, values in average_columns(scores).items():
+        df[col_name] = values
 
-    # Apply the transformation for MCC values
-    mcc_tasks = ["German", "Australian", "LendingClub", "ccf", "ccfraud", "polish", "taiwan", "portoseguro", "travelinsurance"]
-    for task in mcc_tasks:
-        if task in df.columns:
-            df[task] = df.apply(lambda row: (row[task] + 100) / 2.0 if row[task] != "missing" else row[task], axis=1)
+    # Benchmark columns show the normalized scores (e.g. MCC rescaled to [0, 100])
+    normalized_scores = normalize_scores(scores)
+    for i, task in enumerate(TASKS):
+        if task.col_name in benchmark_cols:
+            df[task.col_name] = normalized_scores[:, i]
 
-    for index, row in df.iterrows():
-        if "FinTrade" in row and row["FinTrade"] != "missing":
-            df.loc[index, "FinTrade"] = (row["FinTrade"] + 300) / 6
+    df = df.sort_values(by=[AutoEvalColumn.average.name], ascending=False)
 
     # Now, select the columns that were passed to the function
     df = df[cols]
 
-    # Function to round numeric values, including those in string format
-    def round_numeric(x):
-        try:
-            return round(float(x), 1)
-        except ValueError:
-            return x
-
-    # Apply rounding to all columns except 'T' and 'Model'
+    # Round all numeric columns (booleans included, as before) except 'T' and 'Model'
     for col in df.columns:
-        if col not in ['T', 'Model']:
-            df[col] = df[col].apply(round_numeric)
-
-    # Filter out if any of the benchmarks have not been produced
-    df = df[has_no_nan_values(df, benchmark_cols)]
+        if col not in ['T', 'Model'] and pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = round_column(df[col].to_numpy(dtype=float), 1)
 
     return raw_data, df
 
 
 def get_evaluation_queue_df(save_path: str, cols: list) -> list[pd.DataFrame]:
-    """Creates the different dataframes for the evaluation queues requests"""
-    entries = [entry for entry in os.listdir(save_path) if not entry.startswith(".")]
-    all_evals = []
-
-    for entry in entries:
-        if ".json" in entry:
-            file_path = os.path.join(save_path, entry)
-            with open(file_path) as fp:
-                data = json.load(fp)
-
-            data[EvalQueueColumn.model.name] = make_clickable_model(data["model"])
-            data[EvalQueueColumn.revision.name] = data.get("revision", "main")
-
-            all_evals.append(data)
-        elif ".md" not in entry:
-            # this is a folder
-            sub_entries = [e for e in os.listdir(f"{save_path}/{entry}") if not e.startswith(".")]
-            for sub_entry in sub_entries:
-                file_path = os.path.join(save_path, entry, sub_entry)
-                with open(file_path) as fp:
-                    data = json.load(fp)
-
-                data[EvalQueueColumn.model.name] = make_clickable_model(data["model"])
-                data[EvalQueueColumn.revision.name] = data.get("revision", "main")
-                all_evals.append(data)
-
-    pending_list = [e for e in all_evals if e["status"] in ["PENDING", "RERUN"]]
-    running_list = [e for e in all_evals if e["status"] == "RUNNING"]
-    finished_list = [e for e in all_evals if e["status"].startswith("FINISHED") or e["status"] == "PENDING_NEW_EVAL"]
-    df_pending = pd.DataFrame.from_records(pending_list, columns=cols)
-    df_running = pd.DataFrame.from_records(running_list, columns=cols)
-    df_finished = pd.DataFrame.from_records(finished_list, columns=cols)
-    return df_finished[cols], df_running[cols], df_pending[cols]
+    """Creates the different dataframes for the evaluation queues requests, from the queue catalog"""
+    catalog = get_queue_catalog(save_path)
+    with STAGE_SECONDS.time(stage="queue"):
+        catalog.refresh()
+
+        frames = []
+        for view in ["finished", "running", "pending"]:
+            records = []
+            for request in catalog.view(view):
+                data = dict(request)
+                data[EvalQueueColumn.model.name] = make_clickable_model(request["model"])
+                data[EvalQueueColumn.revision.name] = request.get("revision", "main")
+                records.append(data)
+            frames.append(pd.DataFrame.from_records(records, columns=cols)[cols])
+    return frames
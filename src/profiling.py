@@ -0,0 +1,237 @@
+import cProfile
+import functools
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from src.envs import (
+    PROFILE_EVERY,
+    PROFILE_MAX_DUMPS,
+    PROFILE_MODE,
+    PROFILE_PATH,
+    PROFILE_SAMPLE_INTERVAL,
+    PROFILE_SLOW_THRESHOLD,
+)
+from src.log import get_logger
+
+MODES = ("deterministic", "sampling")
+# Deepest call path, and least time of a call path, written to the collapsed stacks of a deterministic profile
+MAX_STACK_DEPTH = 64
+MIN_STACK_SECONDS = 1e-5
+
+log = get_logger("profiling")
+_local = threading.local()
+
+
+def frame_label(filename: str, line: int, name: str) -> str:
+    """Name of a frame in the collapsed stacks, e.g. "update_table (app.py:169)". Paths are made relative to the
+    Space, to site-packages or to the standard library"""
+    if filename == "~":
+        label = name # built-in function
+    else:
+        for root in (os.getcwd() + os.sep, "site-packages" + os.sep, os.path.dirname(os.__file__) + os.sep):
+            if root in filename:
+                filename = filename.split(root, 1)[1]
+                break
+        label = f"{name} ({filename}:{line})"
+    return label.replace(";", ",")
+
+
+def collapse_frame(frame, root_code) -> str:
+    """Collapsed stack of a frame, from the outermost call of `root_code` down to the frame"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code.co_filename, frame.f_code.co_firstlineno, frame.f_code.co_name))
+        if frame.f_code is root_code:
+            break
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def collapse_stats(stats: dict) -> Counter:
+    """Collapsed stacks of a cProfile profile, weighted by their own time in microseconds.
+    cProfile only keeps the time of each caller -> callee pair, so the time of a function deeper in the stack is split
+    between its call paths in proportion to the time they spent in it: exact for the first level, approximate below"""
+    children = {} # caller -> [(callee, cumulative time when called from the caller)]
+    for callee, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            children.setdefault(caller, []).append((callee, cumulative))
+    stacks = Counter()
+
+    def walk(function, path: list, share: float):
+        _, _, own, cumulative, _ = stats[function]
+        path = path + [frame_label(*function)]
+        weight = round(own * share * 1e6)
+        if weight:
+            stacks[";".join(path)] += weight
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for callee, callee_time in children.get(function, []):
+            callee_total = stats[callee][3]
+            if callee_time * share >= MIN_STACK_SECONDS and frame_label(*callee) not in path:
+                walk(callee, path, callee_time * share / callee_total)
+
+    for function, (_, _, _, _, callers) in stats.items():
+        # The roots are the profiled function, and the call disabling the profiler
+        if not callers and "_lsprof.Profiler" not in function[2]:
+            walk(function, [], 1.0)
+    return stacks
+
+
+class StackSampler:
+    """Samples the stacks of the threads being profiled every `interval` seconds. Its background thread is started
+    with the first profiled call, and sleeps while no call is profiled"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._threads = {} # thread id -> (code of the profiled function, collapsed stack counts)
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def start(self, thread_id: int, root_code):
+        with self._condition:
+            self._threads[thread_id] = (root_code, Counter())
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._worker.start()
+            self._condition.notify()
+
+    def stop(self, thread_id: int) -> Counter:
+        """Stops sampling the thread, returns the number of samples of each of its stacks"""
+        with self._condition:
+            return self._threads.pop(thread_id)[1]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._threads:
+                    self._condition.wait()
+                threads = dict(self._threads)
+            frames = sys._current_frames()
+            for thread_id, (root_code, stacks) in threads.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stack = collapse_frame(frame, root_code)
+                    with self._condition:
+                        stacks[stack] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class FunctionProfiler:
+    """Profiles one call in `every` of a function, and every call when `slow_threshold` is set, keeping the profile of
+    the calls slower than it. Each kept profile is written to `path` as a dump, "{name}-{time}-{reason}.prof" (pstats)
+    in deterministic mode or ".collapsed" in sampling mode, the oldest beyond `max_dumps` being deleted. The stacks
+    of all the kept profiles are also added up in "{name}.collapsed", which flamegraph.pl or speedscope read"""
+
+    def __init__(
+        self,
+        name: str,
+        mode: str,
+        every: int,
+        slow_threshold: float,
+        path: str,
+        max_dumps: int,
+        sampler: StackSampler = None,
+    ):
+        self.name = name
+        self.mode = mode
+        self.every = every
+        self.slow_threshold = slow_threshold
+        self.path = path
+        self.max_dumps = max_dumps
+        self.sampler = sampler
+        self.stacks = Counter() # stacks of all the kept profiles
+        self._calls = itertools.count()
+        self._lock = threading.Lock()
+
+    def call(self, fn, *args, **kwargs):
+        sampled = self.every > 0 and next(self._calls) % self.every == 0
+        # Profiles do not nest: a profiled function called by another one runs as is
+        if not (sampled or self.slow_threshold > 0) or getattr(_local, "active", False):
+            return fn(*args, **kwargs)
+        profile = None
+        if self.mode == "deterministic":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ runs a single cProfile at a time, across threads
+                return fn(*args, **kwargs)
+        else:
+            self.sampler.start(threading.get_ident(), fn.__code__)
+        _local.active = True
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+            else:
+                samples = self.sampler.stop(threading.get_ident())
+            _local.active = False
+            slow = 0 < self.slow_threshold <= seconds
+            if sampled or slow:
+                stacks = collapse_stats(pstats.Stats(profile).stats) if profile is not None else samples
+                self.save(profile, stacks, "slow" if slow else "sampled", seconds)
+
+    def save(self, profile: cProfile.Profile, stacks: Counter, reason: str, seconds: float):
+        """Writes the dump of a profiled call and adds its stacks to the collapsed stacks of the function"""
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        dump = os.path.join(self.path, f"{self.name}-{stamp}-{reason}")
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            if profile is not None:
+                dump += ".prof"
+                profile.dump_stats(dump)
+            else:
+                dump += ".collapsed"
+                write_collapsed(dump, stacks)
+            with self._lock:
+                self.stacks.update(stacks)
+                write_collapsed(os.path.join(self.path, f"{self.name}.collapsed"), self.stacks)
+                self.rotate()
+        except OSError as e:
+            log.warning("Could not write the profile of %s: %s", self.name, e)
+            return
+        log.info("Profiled a %s call of %s (%.3fs) to %s", reason, self.name, seconds, dump)
+
+    def rotate(self):
+        dumps = sorted(f for f in os.listdir(self.path) if f.startswith(f"{self.name}-"))
+        for dump in dumps[: max(0, len(dumps) - self.max_dumps)]:
+            os.remove(os.path.join(self.path, dump))
+
+
+def write_collapsed(path: str, stacks: Counter):
+    """Writes stacks in the collapsed format, one "frame;frame;frame count" line per stack"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+    os.replace(tmp_path, path)
+
+
+_sampler = StackSampler(PROFILE_SAMPLE_INTERVAL) if PROFILE_MODE == "sampling" else None
+if PROFILE_MODE and PROFILE_MODE not in MODES:
+    log.warning("Unknown PROFILE_MODE %s, expected one of %s: profiling is disabled", PROFILE_MODE, ", ".join(MODES))
+
+
+def profiled(fn):
+    """Profiles the calls of fn as set up by the PROFILE_* settings. When profiling is disabled, fn is returned as is"""
+    if PROFILE_MODE not in MODES or (PROFILE_EVERY <= 0 and PROFILE_SLOW_THRESHOLD <= 0):
+        return fn
+    profiler = FunctionProfiler(
+        fn.__name__, PROFILE_MODE, PROFILE_EVERY, PROFILE_SLOW_THRESHOLD, PROFILE_PATH, PROFILE_MAX_DUMPS, _sampler
+    )
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return profiler.call(fn, *args, **kwargs)
+
+    return wrapper
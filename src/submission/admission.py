@@ -0,0 +1,79 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+
+def parse_submitted_time(submitted_time: str) -> float:
+    """Timestamp of the submitted_time of a request, e.g. 2024-05-01T12:00:00Z"""
+    return datetime.strptime(submitted_time, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+
+
+def format_window(seconds: float) -> str:
+    if seconds >= 86400:
+        return f"{seconds / 86400:g} days"
+    if seconds >= 3600:
+        return f"{seconds / 3600:g} hours"
+    return f"{seconds:g} seconds"
+
+
+class AdmissionController:
+    """Sliding-window quota of submissions per organisation: at most `quota` submissions in any `window` seconds.
+    Keeps the sorted submission timestamps of each organisation, so a check is a bisection instead of a scan.
+    `overrides` maps organisations to their own quota. A quota of 0 or less means unlimited.
+    """
+
+    def __init__(self, quota: int, window: float, overrides: dict = None):
+        self.quota = quota
+        self.window = window
+        self.overrides = overrides or {}
+        self._times = defaultdict(list) # organisation -> sorted submission timestamps
+        self._lock = threading.Lock()
+
+    def quota_of(self, organisation: str) -> int:
+        return self.overrides.get(organisation, self.quota)
+
+    def seed(self, times_by_organisation: dict):
+        """Replaces the submission timestamps with the given ones, e.g. from the queue catalog at startup"""
+        with self._lock:
+            self._times = defaultdict(list, {org: sorted(times) for org, times in times_by_organisation.items()})
+
+    def _next_slot(self, organisation: str, now: float) -> float:
+        quota = self.quota_of(organisation)
+        if quota <= 0:
+            return None
+        times = self._times.get(organisation, [])
+        first = bisect.bisect_right(times, now - self.window) # first submission still in the window
+        in_window = len(times) - first
+        if in_window < quota:
+            return None
+        # A slot opens when enough submissions leave the window to be under quota again
+        return times[first + in_window - quota] + self.window
+
+    def next_slot(self, organisation: str, now: float = None) -> float:
+        """None if the organisation can submit now, otherwise the timestamp at which its next slot opens"""
+        with self._lock:
+            return self._next_slot(organisation, time.time() if now is None else now)
+
+    def admit(self, organisation: str, now: float = None) -> float:
+        """Records a submission if the organisation is under quota, atomically.
+        Returns None when admitted, otherwise the timestamp at which the next slot opens"""
+        now = time.time() if now is None else now
+        with self._lock:
+            next_slot = self._next_slot(organisation, now)
+            if next_slot is not None:
+                return next_slot
+            times = self._times[organisation]
+            # Submissions which left the window are never looked at again
+            del times[: bisect.bisect_right(times, now - self.window)]
+            bisect.insort(times, now)
+            return None
+
+    def release(self, organisation: str, timestamp: float):
+        """Forgets an admitted submission which was not accepted in the end"""
+        with self._lock:
+            times = self._times.get(organisation, [])
+            i = bisect.bisect_left(times, timestamp)
+            if i < len(times) and times[i] == timestamp:
+                del times[i]
@@ -1,17 +1,19 @@
-import json
-import os
 import re
-from collections import defaultdict
 from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 
 import huggingface_hub
-from huggingface_hub import ModelCard
 from huggingface_hub.hf_api import ModelInfo
-from transformers import AutoConfig
-from transformers.models.auto.tokenization_auto import AutoTokenizer
+
+from src.submission.hub_files import RemoteHubFiles
+
+# transformers and the model card parser are imported by the functions that use them: this module is imported by the
+# leaderboard build, which must not pay for them before a submission or a hub check actually happens
 
 def check_model_card(repo_id: str) -> tuple[bool, str]:
     """Checks if the model card and license exist and have been filled"""
+    from huggingface_hub import ModelCard
+
     try:
         card = ModelCard.load(repo_id)
     except huggingface_hub.utils.EntryNotFoundError:
@@ -31,8 +33,40 @@ def check_model_card(repo_id: str) -> tuple[bool, str]:
 
     return True, ""
 
-def is_model_on_hub(model_name: str, revision: str, token: str = None, trust_remote_code=False, test_tokenizer=False) -> tuple[bool, str]:
-    """Checks if the model model_name is on the hub, and whether it (and its tokenizer) can be loaded with AutoClasses."""
+TRUST_REMOTE_CODE_ERROR = "needs to be launched with `trust_remote_code=True`. For safety reason, we do not allow these models to be automatically submitted to the leaderboard."
+TOKENIZER_ERROR = "'s tokenizer cannot be loaded. Is your tokenizer class in a stable transformers release, and correctly configured?"
+# Files from which a tokenizer can be built, besides tokenizer_config.json
+TOKENIZER_FILES = {
+    "tokenizer.json",
+    "tokenizer.model",
+    "vocab.json",
+    "vocab.txt",
+    "spiece.model",
+    "sentencepiece.bpe.model",
+    "merges.txt",
+}
+
+
+def is_model_on_hub(
+    model_name: str,
+    revision: str,
+    token: str = None,
+    trust_remote_code=False,
+    test_tokenizer=False,
+    metadata_only=False,
+    hub_files=None,
+) -> tuple[bool, str]:
+    """Checks if the model model_name is on the hub, and whether it (and its tokenizer) can be loaded with AutoClasses.
+    With metadata_only, the same outcomes are decided from the repository files without loading anything,
+    see check_model_files."""
+    if metadata_only:
+        return check_model_files(
+            model_name, revision, token, trust_remote_code, test_tokenizer, hub_files or RemoteHubFiles()
+        )
+
+    from transformers import AutoConfig
+    from transformers.models.auto.tokenization_auto import AutoTokenizer
+
     try:
         config = AutoConfig.from_pretrained(model_name, revision=revision, trust_remote_code=trust_remote_code, token=token)
         if test_tokenizer:
@@ -45,13 +79,13 @@ def is_model_on_hub(model_name: str, revision: str, token: str = None, trust_rem
                     None
                 )
             except Exception as e:
-                return (False, "'s tokenizer cannot be loaded. Is your tokenizer class in a stable transformers release, and correctly configured?", None)
+                return (False, TOKENIZER_ERROR, None)
         return True, None, config
 
     except ValueError:
         return (
             False,
-            "needs to be launched with `trust_remote_code=True`. For safety reason, we do not allow these models to be automatically submitted to the leaderboard.",
+            TRUST_REMOTE_CODE_ERROR,
             None
         )
 
@@ -59,6 +93,70 @@ def is_model_on_hub(model_name: str, revision: str, token: str = None, trust_rem
         return False, "was not found on hub!", None
 
 
+def check_model_files(
+    model_name: str, revision: str, token: str, trust_remote_code: bool, test_tokenizer: bool, hub_files
+) -> tuple[bool, str]:
+    """Metadata-only version of is_model_on_hub: reads the file listing, config.json and tokenizer_config.json of the
+    repository through hub_files (see src/submission/hub_files.py). Nothing is instantiated and no remote code runs.
+    The returned config is a namespace over the parsed config.json."""
+    from transformers.models.auto.configuration_auto import CONFIG_MAPPING_NAMES
+    from transformers.models.auto.tokenization_auto import TOKENIZER_MAPPING_NAMES
+
+    try:
+        files = set(hub_files.list_files(model_name, revision, token))
+        config = hub_files.read_json(model_name, "config.json", revision, token)
+    except Exception:
+        return False, "was not found on hub!", None
+
+    # AutoConfig needs a model_type known to transformers, or custom code that it is allowed to run.
+    # Errors follow the exceptions AutoConfig raises: ValueError without a usable model_type, KeyError for an unknown one
+    model_type = config.get("model_type")
+    auto_map = config.get("auto_map")
+    remote_config = isinstance(auto_map, dict) and "AutoConfig" in auto_map
+    if model_type not in CONFIG_MAPPING_NAMES and not (remote_config and trust_remote_code):
+        if remote_config or model_type is None:
+            return False, TRUST_REMOTE_CODE_ERROR, None
+        return False, "was not found on hub!", None
+
+    if test_tokenizer:
+        tokenizer_config = {}
+        if "tokenizer_config.json" in files:
+            try:
+                tokenizer_config = hub_files.read_json(model_name, "tokenizer_config.json", revision, token)
+            except Exception:
+                return False, TOKENIZER_ERROR, None
+        tokenizer_auto_map = tokenizer_config.get("auto_map")
+        remote_tokenizer = isinstance(tokenizer_auto_map, dict) and "AutoTokenizer" in tokenizer_auto_map
+        tokenizer_class = tokenizer_config.get("tokenizer_class")
+        known_tokenizers = {name for names in TOKENIZER_MAPPING_NAMES.values() for name in names if name is not None}
+        known_tokenizers.add("PreTrainedTokenizerFast")
+
+        if remote_tokenizer and trust_remote_code:
+            pass
+        elif tokenizer_class is not None:
+            # AutoTokenizer falls back on the fast class when the slow one is not available, and the reverse
+            base_class = tokenizer_class.removesuffix("Fast")
+            if not {tokenizer_class, base_class, f"{base_class}Fast"} & known_tokenizers:
+                return (
+                    False,
+                    "uses a tokenizer which is not in a transformers release: "
+                    f"Tokenizer class {tokenizer_class} does not exist or is not currently imported.",
+                    None,
+                )
+        elif not any(TOKENIZER_MAPPING_NAMES.get(model_type) or ()):
+            return (
+                False,
+                "uses a tokenizer which is not in a transformers release: "
+                "Unrecognized configuration class for this kind of AutoModel: AutoTokenizer.",
+                None,
+            )
+
+        if not files & TOKENIZER_FILES:
+            return False, TOKENIZER_ERROR, None
+
+    return True, None, SimpleNamespace(**config)
+
+
 def get_model_size(model_info: ModelInfo, precision: str):
     """Gets the model size from the configuration, or the model name if the configuration does not contain the information."""
     try:
@@ -73,27 +171,3 @@ def get_model_size(model_info: ModelInfo, precision: str):
 def get_model_arch(model_info: ModelInfo):
     """Gets the model architecture from the configuration"""
     return model_info.config.get("architectures", "Unknown")
-
-def already_submitted_models(requested_models_dir: str) -> set[str]:
-    """Gather a list of already submitted models to avoid duplicates"""
-    depth = 1
-    file_names = []
-    users_to_submission_dates = defaultdict(list)
-
-    for root, _, files in os.walk(requested_models_dir):
-        current_depth = root.count(os.sep) - requested_models_dir.count(os.sep)
-        if current_depth == depth:
-            for file in files:
-                if not file.endswith(".json"):
-                    continue
-                with open(os.path.join(root, file), "r") as f:
-                    info = json.load(f)
-                    file_names.append(f"{info['model']}_{info['revision']}_{info['precision']}")
-
-                    # Select organisation
-                    if info["model"].count("/") == 0 or "submitted_time" not in info:
-                        continue
-                    organisation, _ = info["model"].split("/")
-                    users_to_submission_dates[organisation].append(info["submitted_time"])
-
-    return set(file_names), users_to_submission_dates
@@ -0,0 +1,49 @@
+import json
+import os
+
+from huggingface_hub import HfApi, hf_hub_download
+
+
+class RemoteHubFiles:
+    """Reads model repositories from the Hugging Face hub"""
+
+    def list_files(self, repo_id: str, revision: str, token: str = None) -> list[str]:
+        return HfApi().list_repo_files(repo_id, revision=revision, token=token)
+
+    def read_json(self, repo_id: str, filename: str, revision: str, token: str = None) -> dict:
+        path = hf_hub_download(repo_id, filename, revision=revision, token=token)
+        with open(path) as f:
+            return json.load(f)
+
+
+class LocalHubFiles:
+    """Reads model repositories from a local folder laid out as {root}/{org}/{model}/{files}, e.g. a fake hub for tests.
+    A revision other than main is read from {root}/{org}/{model}@{revision} when that folder exists."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _repo_dir(self, repo_id: str, revision: str) -> str:
+        repo_dir = os.path.join(self.root, repo_id)
+        if revision not in (None, "main") and os.path.isdir(f"{repo_dir}@{revision}"):
+            return f"{repo_dir}@{revision}"
+        if not os.path.isdir(repo_dir):
+            raise FileNotFoundError(f"{repo_id} not found in {self.root}")
+        return repo_dir
+
+    def list_files(self, repo_id: str, revision: str, token: str = None) -> list[str]:
+        repo_dir = self._repo_dir(repo_id, revision)
+        return [
+            os.path.relpath(os.path.join(dirpath, filename), repo_dir).replace(os.sep, "/")
+            for dirpath, _, filenames in os.walk(repo_dir)
+            for filename in filenames
+        ]
+
+    def read_json(self, repo_id: str, filename: str, revision: str, token: str = None) -> dict:
+        with open(os.path.join(self._repo_dir(repo_id, revision), filename)) as f:
+            return json.load(f)
+
+
+def get_hub_files(root: str = None):
+    """Local fake hub when root is set, the real hub otherwise"""
+    return LocalHubFiles(root) if root else RemoteHubFiles()
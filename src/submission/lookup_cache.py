@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class LookupCache:
+    """Short-lived cache of hub lookups, with single-flight: concurrent lookups of the same key wait for the one
+    already in flight instead of calling the hub again. Failed lookups are cached too, with their own TTL.
+    Exceptions are passed to every waiting caller and are not cached.
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._in_flight = {} # key -> Future
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, lookup, failed=lambda value: False):
+        """Returns the cached value of key, or runs lookup() once for all the callers asking for key meanwhile.
+        failed(value) tells whether the value is a failure, cached for negative_ttl instead of ttl"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            value = lookup()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        ttl = self.negative_ttl if failed(value) else self.ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -1,19 +1,173 @@
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import partial
 
 from src.display.formatting import styled_error, styled_message, styled_warning
-from src.envs import API, EVAL_REQUESTS_PATH, TOKEN, QUEUE_REPO
+from src.envs import (
+    API,
+    EVAL_REQUESTS_PATH,
+    HUB_FILES_ROOT,
+    QUEUE_FLUSH_INTERVAL,
+    QUEUE_FLUSH_MAX_ATTEMPTS,
+    QUEUE_FLUSH_MAX_BATCH,
+    QUEUE_FLUSH_MAX_RETRY_DELAY,
+    QUEUE_FLUSH_RETRY_DELAY,
+    QUEUE_JOURNAL_PATH,
+    SUBMISSION_CHECK_WORKERS,
+    SUBMISSION_HUB_CHECK,
+    SUBMISSION_LOOKUP_CACHE_MAX_ENTRIES,
+    SUBMISSION_LOOKUP_CACHE_NEGATIVE_TTL,
+    SUBMISSION_LOOKUP_CACHE_TTL,
+    SUBMISSION_QUOTA,
+    SUBMISSION_QUOTA_OVERRIDES,
+    SUBMISSION_QUOTA_WINDOW,
+    TOKEN,
+    QUEUE_REPO,
+)
+from src.leaderboard.queue_catalog import get_queue_catalog
+from src.log import get_logger
+from src.metrics import HUB_CHECK_SECONDS, METRICS, SUBMISSION_SECONDS, SUBMISSIONS
+from src.profiling import profiled
+from src.submission.admission import AdmissionController, format_window, parse_submitted_time
 from src.submission.check_validity import (
-    already_submitted_models,
     check_model_card,
     get_model_size,
     is_model_on_hub,
 )
+from src.submission.hub_files import get_hub_files
+from src.submission.lookup_cache import LookupCache
+from src.submission.upload_queue import UploadBuffer
+
+# Hub checks of all the submissions in flight. Shared, so that returning early never waits for the pool to shut down
+CHECK_POOL = ThreadPoolExecutor(max_workers=SUBMISSION_CHECK_WORKERS, thread_name_prefix="submission-check")
+# Results of the hub checks per model and revision, so that repeated or concurrent submissions of a model share them
+LOOKUPS = LookupCache(
+    ttl=SUBMISSION_LOOKUP_CACHE_TTL,
+    negative_ttl=SUBMISSION_LOOKUP_CACHE_NEGATIVE_TTL,
+    max_entries=SUBMISSION_LOOKUP_CACHE_MAX_ENTRIES,
+)
+# Request files of accepted submissions, journaled locally and committed to the queue dataset in batches
+QUEUE_UPLOADS = UploadBuffer(
+    api=API,
+    repo_id=QUEUE_REPO,
+    journal_path=QUEUE_JOURNAL_PATH,
+    flush_interval=QUEUE_FLUSH_INTERVAL,
+    max_batch=QUEUE_FLUSH_MAX_BATCH,
+    retry_delay=QUEUE_FLUSH_RETRY_DELAY,
+    max_retry_delay=QUEUE_FLUSH_MAX_RETRY_DELAY,
+    max_attempts=QUEUE_FLUSH_MAX_ATTEMPTS,
+)
+# Submissions accepted per organisation, seeded from the queue catalog by seed_admission
+ADMISSION = AdmissionController(SUBMISSION_QUOTA, SUBMISSION_QUOTA_WINDOW, SUBMISSION_QUOTA_OVERRIDES)
+METRICS.register_cache("submission_lookups", LOOKUPS.stats)
+
+log = get_logger("submission")
+
+
+def start_queue_uploads():
+    """Replays the requests journaled before a restart into the queue catalog, and starts committing them"""
+    QUEUE_UPLOADS.start()
+    queue_catalog = get_queue_catalog(EVAL_REQUESTS_PATH)
+    for upload in QUEUE_UPLOADS.pending():
+        queue_catalog.add(os.path.join(EVAL_REQUESTS_PATH, upload.path_in_repo.lstrip("/")), json.loads(upload.content))
+
+
+def seed_admission():
+    """Seeds the submission quotas with the requests of the queue catalog. Requests whose submitted_time cannot be
+    parsed, e.g. from older versions of the Space, do not count"""
+    times_by_org = {}
+    unparsed = []
+    for organisation, submission_times in get_queue_catalog(EVAL_REQUESTS_PATH).submission_times_by_org().items():
+        times_by_org[organisation] = []
+        for submitted_time in submission_times:
+            try:
+                times_by_org[organisation].append(parse_submitted_time(submitted_time))
+            except (TypeError, ValueError):
+                unparsed.append(f"{organisation}: {submitted_time!r}")
+    if unparsed:
+        log.warning("Ignoring %d unparseable submission times in the quotas: %s", len(unparsed), ", ".join(unparsed))
+    ADMISSION.seed(times_by_org)
+
+
+def quota_error(organisation: str, next_slot: float) -> str:
+    opens_at = datetime.fromtimestamp(next_slot, timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    return (
+        f"Organisation {organisation} already submitted {ADMISSION.quota_of(organisation)} models in the last "
+        f"{format_window(ADMISSION.window)}. Its next submission slot opens at {opens_at}."
+    )
+
+
+def check_on_hub(model_name: str, revision: str, label: str) -> tuple[str, None]:
+    def lookup():
+        with HUB_CHECK_SECONDS.time(check="on_hub"):
+            return is_model_on_hub(
+                model_name=model_name,
+                revision=revision,
+                token=TOKEN,
+                test_tokenizer=True,
+                metadata_only=SUBMISSION_HUB_CHECK == "metadata",
+                hub_files=get_hub_files(HUB_FILES_ROOT),
+            )[:2]
+
+    on_hub, error = LOOKUPS.get(("on_hub", model_name, revision), lookup, failed=lambda result: not result[0])
+    return (None if on_hub else f"{label} {error}"), None
+
+
+def check_model_info(model: str, revision: str) -> tuple[str, tuple]:
+    return LOOKUPS.get(
+        ("model_info", model, revision),
+        partial(lookup_model_info, model, revision),
+        failed=lambda result: result[0] is not None,
+    )
+
+
+def lookup_model_info(model: str, revision: str) -> tuple[str, tuple]:
+    """Is the model info correctly filled? Returns the model info and its license"""
+    try:
+        with HUB_CHECK_SECONDS.time(check="model_info"):
+            model_info = API.model_info(repo_id=model, revision=revision)
+    except Exception:
+        return "Could not get your model information. Please fill it up properly.", None
+
+    # Was the license filled?
+    try:
+        license = model_info.cardData["license"]
+    except Exception:
+        return "Please select a license for your model", None
+    return None, (model_info, license)
+
+
+def check_card(model: str) -> tuple[str, None]:
+    modelcard_OK, error_msg = LOOKUPS.get(
+        ("model_card", model), partial(lookup_model_card, model), failed=lambda result: not result[0]
+    )
+    return (None if modelcard_OK else error_msg), None
+
 
-REQUESTED_MODELS = None
-USERS_TO_SUBMISSION_DATES = None
+def lookup_model_card(model: str) -> tuple[bool, str]:
+    with HUB_CHECK_SECONDS.time(check="model_card"):
+        return check_model_card(model)
 
+
+def run_checks(checks: list) -> tuple[str, list]:
+    """Runs the checks concurrently. Each check returns (error, value).
+    Returns the error of the first failing check, in the order of `checks`, as soon as it and all the checks before
+    it are done, and cancels the checks not started yet. Otherwise returns the values of all the checks"""
+    futures = [CHECK_POOL.submit(check) for check in checks]
+    values = []
+    for i, future in enumerate(futures):
+        error, value = future.result()
+        if error is not None:
+            for pending in futures[i + 1 :]:
+                pending.cancel()
+            return error, values
+        values.append(value)
+    return None, values
+
+
+@profiled
 def add_new_eval(
     model: str,
     base_model: str,
@@ -22,10 +176,7 @@ def add_new_eval(
     weight_type: str,
     model_type: str,
 ):
-    global REQUESTED_MODELS
-    global USERS_TO_SUBMISSION_DATES
-    if not REQUESTED_MODELS:
-        REQUESTED_MODELS, USERS_TO_SUBMISSION_DATES = already_submitted_models(EVAL_REQUESTS_PATH)
+    queue_catalog = get_queue_catalog(EVAL_REQUESTS_PATH)
 
     user_name = ""
     model_path = model
@@ -37,43 +188,41 @@ def add_new_eval(
     current_time = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
     if model_type is None or model_type == "":
+        SUBMISSIONS.inc(outcome="invalid")
         return styled_error("Please select a model type.")
 
+    # Is the organisation under its submission quota? Checked before the hub checks, counted once accepted
+    if user_name:
+        next_slot = ADMISSION.next_slot(user_name)
+        if next_slot is not None:
+            SUBMISSIONS.inc(outcome="over_quota")
+            return styled_error(quota_error(user_name, next_slot))
+
     # Does the model actually exist?
     if revision == "":
         revision = "main"
 
+    # The hub checks are independent: they run concurrently, errors are reported in this order
+    checks = []
     # Is the model on the hub?
     if weight_type in ["Delta", "Adapter"]:
-        base_model_on_hub, error, _ = is_model_on_hub(model_name=base_model, revision=revision, token=TOKEN, test_tokenizer=True)
-        if not base_model_on_hub:
-            return styled_error(f'Base model "{base_model}" {error}')
-
+        checks.append(partial(check_on_hub, base_model, revision, f'Base model "{base_model}"'))
     if not weight_type == "Adapter":
-        model_on_hub, error, _ = is_model_on_hub(model_name=model, revision=revision, token=TOKEN, test_tokenizer=True)
-        if not model_on_hub:
-            return styled_error(f'Model "{model}" {error}')
-
-    # Is the model info correctly filled?
-    try:
-        model_info = API.model_info(repo_id=model, revision=revision)
-    except Exception:
-        return styled_error("Could not get your model information. Please fill it up properly.")
+        checks.append(partial(check_on_hub, model, revision, f'Model "{model}"'))
+    # Are the model info, license and model card correctly filled?
+    checks.append(partial(check_model_info, model, revision))
+    checks.append(partial(check_card, model))
 
+    with SUBMISSION_SECONDS.time(step="validation"):
+        error, values = run_checks(checks)
+    if error is not None:
+        SUBMISSIONS.inc(outcome="invalid")
+        return styled_error(error)
+    model_info, license = values[-2]
     model_size = get_model_size(model_info=model_info, precision=precision)
 
-    # Were the model card and license filled?
-    try:
-        license = model_info.cardData["license"]
-    except Exception:
-        return styled_error("Please select a license for your model")
-
-    modelcard_OK, error_msg = check_model_card(model)
-    if not modelcard_OK:
-        return styled_error(error_msg)
-
     # Seems good, creating the eval
-    print("Adding new eval")
+    log.info("Adding new eval of %s", model)
 
     eval_entry = {
         "model": model,
@@ -90,30 +239,35 @@ def add_new_eval(
         "private": False,
     }
 
-    # Check for duplicate submission
-    if f"{model}_{revision}_{precision}" in REQUESTED_MODELS:
-        return styled_warning("This model has been already submitted.")
+    path_in_repo = f"{user_name}/{model_path}_eval_request_False_{precision}_{weight_type}.json"
+    out_path = os.path.join(EVAL_REQUESTS_PATH, path_in_repo.lstrip("/"))
 
-    print("Creating eval file")
-    OUT_DIR = f"{EVAL_REQUESTS_PATH}/{user_name}"
-    os.makedirs(OUT_DIR, exist_ok=True)
-    out_path = f"{OUT_DIR}/{model_path}_eval_request_False_{precision}_{weight_type}.json"
-
-    with open(out_path, "w") as f:
-        f.write(json.dumps(eval_entry))
-
-    print("Uploading eval file")
-    API.upload_file(
-        path_or_fileobj=out_path,
-        path_in_repo=out_path.split("eval-queue/")[1],
-        repo_id=QUEUE_REPO,
-        repo_type="dataset",
-        commit_message=f"Add {model} to eval queue",
-    )
+    # Take a slot of the organisation quota, then check for duplicate submission and reserve this one
+    submitted_at = parse_submitted_time(current_time)
+    if user_name:
+        next_slot = ADMISSION.admit(user_name, submitted_at)
+        if next_slot is not None:
+            SUBMISSIONS.inc(outcome="over_quota")
+            return styled_error(quota_error(user_name, next_slot))
+    if not queue_catalog.claim(out_path, eval_entry):
+        if user_name:
+            ADMISSION.release(user_name, submitted_at)
+        SUBMISSIONS.inc(outcome="duplicate")
+        return styled_warning("This model has been already submitted.")
 
-    # Remove the local file
-    os.remove(out_path)
+    # The request is acknowledged once journaled, it reaches the queue dataset with the next batch commit
+    try:
+        log.debug("Queueing eval file %s", path_in_repo)
+        with SUBMISSION_SECONDS.time(step="journal"):
+            QUEUE_UPLOADS.submit(path_in_repo, json.dumps(eval_entry), commit_message=f"Add {model} to eval queue")
+    except Exception:
+        queue_catalog.discard(out_path)
+        if user_name:
+            ADMISSION.release(user_name, submitted_at)
+        SUBMISSIONS.inc(outcome="error")
+        raise
 
+    SUBMISSIONS.inc(outcome="accepted")
     return styled_message(
         "Your request has been submitted to the evaluation queue!\nPlease wait for up to an hour for the model to show in the PENDING list."
     )
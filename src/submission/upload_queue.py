@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+
+from huggingface_hub import CommitOperationAdd
+from huggingface_hub.utils import HfHubHTTPError
+
+from src.log import get_logger
+from src.metrics import SUBMISSION_SECONDS
+
+log = get_logger("upload_queue")
+# Client errors that are worth retrying: request timeout and rate limit
+RETRIED_STATUS_CODES = {408, 429}
+
+
+@dataclass
+class PendingUpload:
+    path_in_repo: str
+    content: str
+    commit_message: str
+    journal_file: str = None # set once the upload is journaled
+
+
+class UploadBuffer:
+    """Write-behind buffer of the files to add to a dataset repository.
+    `submit` returns once the file is durably written to a local journal. A background thread then commits the
+    journaled files, up to max_batch of them in a single commit, every flush_interval seconds or as soon as max_batch
+    files are waiting. Failed commits are retried with exponential backoff, and the journal left by a crash is
+    replayed by `start`. After max_attempts consecutive failures, the files of the failing batch are committed one at
+    a time, so that one rejected file cannot hold back the others: the files the hub rejects (see `is_rejection`) are
+    moved to the "failed" folder of the journal (dead letters, to inspect, and to move back to the journal to retry
+    them). Any other error, e.g. the hub being down, leaves the files journaled and the commits keep being retried.
+
+    `api` only needs a create_commit(repo_id=..., repo_type=..., operations=..., commit_message=...) method, like HfApi
+    or LocalRepoApi.
+    """
+
+    def __init__(
+        self,
+        api,
+        repo_id: str,
+        journal_path: str,
+        flush_interval: float,
+        max_batch: int,
+        retry_delay: float = 5,
+        max_retry_delay: float = 600,
+        max_attempts: int = 8,
+        repo_type: str = "dataset",
+    ):
+        self.api = api
+        self.repo_id = repo_id
+        self.repo_type = repo_type
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        self.dead_letter_path = os.path.join(journal_path, "failed")
+        self.commits = 0
+        self.failures = 0 # consecutive failed commits
+        self.dead_letters = 0
+        self._pending = [] # PendingUpload, in submission order
+        self._thread = None
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+
+    def start(self):
+        """Replays the journal and starts the flush thread. Does nothing if already started"""
+        with self._condition:
+            if self._thread is not None:
+                return
+            os.makedirs(self.journal_path, exist_ok=True)
+            for journal_file in sorted(os.listdir(self.journal_path)):
+                if not journal_file.endswith(".json"):
+                    continue # interrupted journal writes
+                with open(os.path.join(self.journal_path, journal_file)) as f:
+                    upload = PendingUpload(**json.load(f))
+                upload.journal_file = journal_file
+                self._pending.append(upload)
+            if self._pending:
+                log.info("Replaying %d journaled uploads to %s", len(self._pending), self.repo_id)
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="upload-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self, flush: bool = True):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        if flush:
+            try:
+                while self.flush():
+                    pass
+            except Exception as e:
+                log.warning("Could not commit queued uploads to %s before stopping, they stay journaled: %s", self.repo_id, e)
+
+    def submit(self, path_in_repo: str, content: str, commit_message: str):
+        """Journals the file to upload. Once this returns, the upload survives a crash of the process"""
+        self.start()
+        upload = PendingUpload(path_in_repo=path_in_repo, content=content, commit_message=commit_message)
+        journal_file = f"{time.time_ns():020d}-{uuid.uuid4().hex}.json"
+        tmp_path = os.path.join(self.journal_path, f"{journal_file}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(asdict(upload), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.journal_path, journal_file))
+        upload.journal_file = journal_file
+        with self._condition:
+            self._pending.append(upload)
+            if len(self._pending) >= self.max_batch:
+                self._condition.notify_all()
+
+    def pending(self) -> list[PendingUpload]:
+        with self._condition:
+            return list(self._pending)
+
+    def flush(self) -> int:
+        """Commits up to max_batch pending files at once. Returns the number of files committed, raises if the commit fails"""
+        with self._flush_lock:
+            with self._condition:
+                batch = self._pending[: self.max_batch]
+            if not batch:
+                return 0
+            self._commit(batch)
+            for upload in batch:
+                os.remove(os.path.join(self.journal_path, upload.journal_file))
+            with self._condition:
+                del self._pending[: len(batch)]
+            return len(batch)
+
+    def flush_each(self) -> int:
+        """Commits up to max_batch pending files one at a time, and moves the files the hub rejects to the dead letters.
+        Returns the number of files committed, raises on the first failure that is not a rejection"""
+        with self._flush_lock:
+            with self._condition:
+                batch = self._pending[: self.max_batch]
+            committed = 0
+            for upload in batch:
+                journal_file = os.path.join(self.journal_path, upload.journal_file)
+                try:
+                    self._commit([upload])
+                except Exception as e:
+                    if not is_rejection(e):
+                        raise
+                    os.makedirs(self.dead_letter_path, exist_ok=True)
+                    os.replace(journal_file, os.path.join(self.dead_letter_path, upload.journal_file))
+                    self.dead_letters += 1
+                    log.error(
+                        "Could not commit %s to %s, moved it to %s: %s",
+                        upload.path_in_repo,
+                        self.repo_id,
+                        self.dead_letter_path,
+                        e,
+                    )
+                else:
+                    os.remove(journal_file)
+                    committed += 1
+                with self._condition:
+                    self._pending.remove(upload)
+            return committed
+
+    def _commit(self, batch: list[PendingUpload]):
+        commit_message = batch[0].commit_message if len(batch) == 1 else f"Add {len(batch)} requests to eval queue"
+        with SUBMISSION_SECONDS.time(step="upload"):
+            self.api.create_commit(
+                repo_id=self.repo_id,
+                repo_type=self.repo_type,
+                operations=[
+                    CommitOperationAdd(path_in_repo=upload.path_in_repo, path_or_fileobj=upload.content.encode())
+                    for upload in batch
+                ],
+                commit_message=commit_message,
+            )
+        self.commits += 1
+
+    def _run(self):
+        delay = self.flush_interval
+        while True:
+            with self._condition:
+                # A full batch is committed right away, unless the last commit failed: then wait out the backoff
+                deadline = time.monotonic() + delay
+                while not self._stopped and (self.failures or len(self._pending) < self.max_batch):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(timeout=remaining)
+                if self._stopped:
+                    return
+            try:
+                if self.failures >= self.max_attempts:
+                    # The batch keeps failing: commit its files one by one, setting aside the ones rejected
+                    self.flush_each()
+                    self.failures = 0
+                while self.flush() == self.max_batch:
+                    pass
+                self.failures = 0
+                delay = self.flush_interval
+            except Exception as e:
+                self.failures += 1
+                delay = min(self.max_retry_delay, self.retry_delay * 2 ** (self.failures - 1))
+                log.warning("Could not commit queued uploads to %s, retrying in %.0fs: %s", self.repo_id, delay, e)
+
+
+def is_rejection(error: Exception) -> bool:
+    """Whether the hub refused a commit for good, with a client error (e.g. 400, 403, 422), rather than failing to
+    process it (server errors, timeouts, lost connections)"""
+    response = error.response if isinstance(error, HfHubHTTPError) else None
+    if response is None:
+        return False
+    return 400 <= response.status_code < 500 and response.status_code not in RETRIED_STATUS_CODES
+
+
+class LocalRepoApi:
+    """Stand-in for HfApi.create_commit that writes the committed files under a local folder, e.g. for tests"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.commits = []
+
+    def create_commit(self, repo_id: str, operations: list, commit_message: str, repo_type: str = None, **kwargs):
+        for operation in operations:
+            path = os.path.join(self.root, operation.path_in_repo.lstrip("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(operation.path_or_fileobj)
+        self.commits.append((commit_message, [operation.path_in_repo for operation in operations]))
@@ -0,0 +1,29 @@
+import time
+
+
+class PhaseTimer:
+    """Wall-clock time of consecutive phases, e.g. of the Space startup. Each lap closes the current phase"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = [] # (name, seconds)
+        self._last = self.started
+
+    def lap(self, name: str) -> float:
+        now = time.perf_counter()
+        seconds = now - self._last
+        self.phases.append((name, seconds))
+        self._last = now
+        return seconds
+
+    def report(self, title: str = "Startup") -> str:
+        total = self._last - self.started
+        lines = [f"{title} took {total:.2f}s"]
+        for name, seconds in self.phases:
+            share = seconds / total if total else 0.0
+            lines.append(f"  {name:<12} {seconds:8.2f}s {share:6.1%}")
+        return "\n".join(lines)
+
+
+# Startup of the Space, started when this module is first imported: app.py imports it before anything else
+STARTUP = PhaseTimer()
@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.submission.lookup_cache import LookupCache
+
+CALLERS = 8
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def get_concurrently(cache: LookupCache, key: tuple, lookup) -> list:
+    """Calls cache.get(key, lookup) from CALLERS threads at once, returns what each call returned or raised"""
+
+    def call():
+        try:
+            return cache.get(key, lookup)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(CALLERS) as pool:
+        return list(pool.map(lambda _: call(), range(CALLERS)))
+
+
+def test_concurrent_gets_run_one_lookup():
+    cache = LookupCache(ttl=60, negative_ttl=60, max_entries=10)
+    calls = []
+
+    def lookup():
+        calls.append(threading.get_ident())
+        # Returns once every other caller waits for this lookup
+        wait_for(lambda: cache.coalesced == CALLERS - 1)
+        return "config"
+
+    assert get_concurrently(cache, ("org/model", "main"), lookup) == ["config"] * CALLERS
+    assert len(calls) == 1
+    assert cache.get(("org/model", "main"), lookup) == "config"
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["coalesced"]) == (1, 1, CALLERS - 1)
+    assert stats["hit_rate"] == CALLERS / (CALLERS + 1)
+
+
+def test_failed_lookups_expire_after_negative_ttl():
+    cache = LookupCache(ttl=60, negative_ttl=0.05, max_entries=10)
+    calls = {"org/missing": 0, "org/model": 0}
+
+    def lookup(model):
+        calls[model] += 1
+        return None if model == "org/missing" else "config"
+
+    def get(model):
+        return cache.get((model, "main"), lambda: lookup(model), failed=lambda value: value is None)
+
+    assert get("org/missing") is None and get("org/model") == "config"
+    assert get("org/missing") is None and get("org/model") == "config"
+    assert calls == {"org/missing": 1, "org/model": 1}
+    time.sleep(0.1)
+    # The failure is looked up again, the success is still cached
+    assert get("org/missing") is None and get("org/model") == "config"
+    assert calls == {"org/missing": 2, "org/model": 1}
+
+
+def test_exceptions_reach_every_caller_and_are_not_cached():
+    cache = LookupCache(ttl=60, negative_ttl=60, max_entries=10)
+    error = ConnectionError("hub unreachable")
+    calls = []
+
+    def failing_lookup():
+        calls.append(1)
+        wait_for(lambda: cache.coalesced == CALLERS - 1)
+        raise error
+
+    assert get_concurrently(cache, ("org/model", "main"), failing_lookup) == [error] * CALLERS
+    assert len(calls) == 1
+    assert cache.stats()["entries"] == 0
+
+    # The next call looks the key up again
+    assert cache.get(("org/model", "main"), lambda: "config") == "config"
+    with pytest.raises(ConnectionError):
+        cache.get(("org/other", "main"), failing_lookup)
+
+
+def test_evicts_least_recently_stored_entries():
+    cache = LookupCache(ttl=60, negative_ttl=60, max_entries=2)
+    for model in ["org/a", "org/b", "org/c"]:
+        cache.get((model, "main"), lambda: model)
+    assert cache.stats()["entries"] == 2
+    assert cache.get(("org/a", "main"), lambda: "reloaded") == "reloaded"
+    assert cache.get(("org/c", "main"), lambda: "reloaded") == "org/c"
@@ -0,0 +1,156 @@
+import os
+import time
+
+import pytest
+import requests
+from huggingface_hub.utils import HfHubHTTPError
+
+from src.submission.upload_queue import LocalRepoApi, UploadBuffer, is_rejection
+
+
+def http_error(status_code: int) -> HfHubHTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return HfHubHTTPError(f"{status_code} error", response=response)
+
+
+class FlakyRepoApi(LocalRepoApi):
+    """LocalRepoApi failing its first `failures` commits with `status_code`, and rejecting every commit of a path in
+    `rejected`"""
+
+    def __init__(self, root: str, failures: int = 0, status_code: int = 503, rejected: tuple = ()):
+        super().__init__(root)
+        self.failures = failures
+        self.status_code = status_code
+        self.rejected = rejected
+        self.attempts = [] # time of each create_commit call
+
+    def create_commit(self, repo_id: str, operations: list, commit_message: str, repo_type: str = None, **kwargs):
+        self.attempts.append(time.monotonic())
+        if any(operation.path_in_repo in self.rejected for operation in operations):
+            raise http_error(422)
+        if self.failures:
+            self.failures -= 1
+            raise http_error(self.status_code)
+        super().create_commit(repo_id, operations, commit_message, repo_type, **kwargs)
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def journal_files(buffer: UploadBuffer) -> list:
+    return [f for f in os.listdir(buffer.journal_path) if f.endswith(".json")]
+
+
+@pytest.fixture
+def make_buffer(tmp_path):
+    buffers = []
+
+    def make(api, **kwargs):
+        options = dict(flush_interval=60, max_batch=3, retry_delay=0.01, max_retry_delay=0.05, max_attempts=8)
+        options.update(kwargs)
+        buffer = UploadBuffer(api, "org/requests", str(tmp_path / "journal"), **options)
+        buffers.append(buffer)
+        return buffer
+
+    yield make
+    for buffer in buffers:
+        buffer.stop(flush=False)
+
+
+def test_commits_full_batches_at_once(tmp_path, make_buffer):
+    api = LocalRepoApi(str(tmp_path / "repo"))
+    buffer = make_buffer(api)
+    for i in range(3):
+        buffer.submit(f"org/model_{i}.json", f'{{"i": {i}}}', f"Add org/model_{i}")
+    wait_for(lambda: api.commits)
+    assert api.commits == [("Add 3 requests to eval queue", [f"org/model_{i}.json" for i in range(3)])]
+
+    # A batch that is not full waits for flush_interval, or for stop
+    buffer.submit("org/model_3.json", '{"i": 3}', "Add org/model_3")
+    time.sleep(0.1)
+    assert len(api.commits) == 1
+    buffer.stop(flush=True)
+    assert api.commits[1] == ("Add org/model_3", ["org/model_3.json"])
+    assert (tmp_path / "repo" / "org" / "model_3.json").read_text() == '{"i": 3}'
+    assert not buffer.pending()
+    assert not journal_files(buffer)
+
+
+def test_replays_journal_after_crash(tmp_path, make_buffer):
+    crashed = make_buffer(LocalRepoApi(str(tmp_path / "lost")))
+    crashed.submit("org/model_a.json", "a", "Add org/model_a")
+    crashed.submit("org/model_b.json", "b", "Add org/model_b")
+    # Left over by a write interrupted by the crash
+    (tmp_path / "journal" / "interrupted.json.tmp").write_text("{")
+
+    api = LocalRepoApi(str(tmp_path / "repo"))
+    restarted = make_buffer(api)
+    restarted.start()
+    assert [upload.path_in_repo for upload in restarted.pending()] == ["org/model_a.json", "org/model_b.json"]
+    restarted.stop(flush=True)
+    assert api.commits == [("Add 2 requests to eval queue", ["org/model_a.json", "org/model_b.json"])]
+    assert not journal_files(restarted)
+
+
+def test_retries_failed_commits_with_backoff(tmp_path, make_buffer):
+    api = FlakyRepoApi(str(tmp_path / "repo"), failures=3)
+    buffer = make_buffer(api, max_batch=1, retry_delay=0.05, max_retry_delay=1)
+    buffer.submit("org/model.json", "{}", "Add org/model")
+    wait_for(lambda: api.commits and buffer.failures == 0)
+    assert len(api.attempts) == 4
+    # Waited 0.05s, 0.1s then 0.2s between the attempts
+    waits = [later - earlier for earlier, later in zip(api.attempts, api.attempts[1:])]
+    assert waits[0] >= 0.05 and waits[1] >= 0.1 and waits[2] >= 0.2
+    assert buffer.dead_letters == 0
+
+
+def test_dead_letters_rejected_uploads(tmp_path, make_buffer):
+    api = FlakyRepoApi(str(tmp_path / "repo"), rejected=("org/bad.json",))
+    buffer = make_buffer(api, max_attempts=2)
+    for name in ("good_1", "bad", "good_2"):
+        buffer.submit(f"org/{name}.json", "{}", f"Add org/{name}")
+    wait_for(lambda: not buffer.pending())
+    # The batch failed twice, then its files were committed one at a time
+    assert api.commits == [("Add org/good_1", ["org/good_1.json"]), ("Add org/good_2", ["org/good_2.json"])]
+    assert buffer.dead_letters == 1
+    assert len(os.listdir(buffer.dead_letter_path)) == 1
+    assert not journal_files(buffer)
+
+
+def test_keeps_retrying_through_hub_outage(tmp_path, make_buffer):
+    api = FlakyRepoApi(str(tmp_path / "repo"), failures=10**6)
+    buffer = make_buffer(api, max_batch=1, max_attempts=2)
+    buffer.submit("org/model.json", "{}", "Add org/model")
+    wait_for(lambda: len(api.attempts) >= 6)
+    assert buffer.dead_letters == 0
+    assert not os.path.exists(buffer.dead_letter_path)
+    assert len(buffer.pending()) == 1
+    assert len(journal_files(buffer)) == 1
+
+    # Once the hub is back, the upload is committed
+    api.failures = 0
+    wait_for(lambda: not buffer.pending())
+    assert api.commits == [("Add org/model", ["org/model.json"])]
+
+
+@pytest.mark.parametrize(
+    "error, rejected",
+    [
+        (http_error(400), True),
+        (http_error(403), True),
+        (http_error(422), True),
+        (http_error(408), False),
+        (http_error(429), False),
+        (http_error(500), False),
+        (http_error(503), False),
+        (requests.ConnectionError(), False),
+        (TimeoutError(), False),
+    ],
+)
+def test_is_rejection(error, rejected):
+    assert is_rejection(error) == rejected